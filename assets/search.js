@@ -0,0 +1,167 @@
+// 站内搜索：查询 build 时生成的 /search/ 分片索引 (search_index.py)
+// 只下载 meta.json 和查询词所在的分片。
+// tokenize() / getShard() 必须与 search_index.py 保持一致。
+(function () {
+  const SEARCH_URL = '/search/';
+  const MAX_RESULTS = 10;
+  const TOKEN_PATTERN = /[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+/g;
+
+  const input = document.getElementById('search-input');
+  const results = document.getElementById('search-results');
+  if (!input || !results) return;
+
+  let meta = null;
+  const shards = {};
+  let timer = null;
+  let queryId = 0;
+
+  // 返回 [token, isPrefix]：单个汉字与未打完的英文词按前缀匹配
+  function tokenize(text, forQuery) {
+    const terms = [];
+    const normalized = text.normalize('NFKC').toLowerCase();
+    const runs = normalized.match(TOKEN_PATTERN) || [];
+    runs.forEach(function (run, i) {
+      const last = i === runs.length - 1;
+      if (run[0] < '\u3040') {
+        const prefix = forQuery && last && !/\s$/.test(normalized);
+        if (run.length > 1 || /^\d+$/.test(run) || prefix) terms.push([run, prefix]);
+      } else if (run.length === 1) {
+        terms.push([run, forQuery]);
+      } else {
+        for (let j = 0; j < run.length - 1; j++) terms.push([run.slice(j, j + 2), false]);
+      }
+    });
+    return terms;
+  }
+
+  function getShard(token) {
+    return token.charCodeAt(0) % meta.shards;
+  }
+
+  function fetchJSON(url) {
+    return fetch(url).then(function (r) {
+      if (!r.ok) throw new Error(url + ': ' + r.status);
+      return r.json();
+    });
+  }
+
+  function loadMeta() {
+    if (!meta) {
+      meta = fetchJSON(SEARCH_URL + 'meta.json').then(function (data) {
+        meta = data;
+        return data;
+      }, function (e) {
+        meta = null;
+        throw e;
+      });
+    }
+    return Promise.resolve(meta);
+  }
+
+  function loadShard(n) {
+    if (!shards[n]) {
+      shards[n] = fetchJSON(SEARCH_URL + n + '.json').catch(function (e) {
+        delete shards[n];
+        throw e;
+      });
+    }
+    return shards[n];
+  }
+
+  // {doc: score}，前缀匹配时同一文档取最高分
+  function postings(shard, term) {
+    const scores = {};
+    function add(list) {
+      for (let i = 0; i < list.length; i += 2) {
+        scores[list[i]] = Math.max(scores[list[i]] || 0, list[i + 1]);
+      }
+    }
+    if (term[1]) {
+      for (const token in shard) {
+        if (token.startsWith(term[0])) add(shard[token]);
+      }
+    } else if (shard[term[0]]) {
+      add(shard[term[0]]);
+    }
+    return scores;
+  }
+
+  // 所有词都命中的文档优先 (AND)，没有时退回任一词命中 (OR)
+  function rank(lists) {
+    const total = {};
+    const hits = {};
+    lists.forEach(function (scores) {
+      for (const doc in scores) {
+        total[doc] = (total[doc] || 0) + scores[doc];
+        hits[doc] = (hits[doc] || 0) + 1;
+      }
+    });
+    let docs = Object.keys(total).filter(function (doc) { return hits[doc] === lists.length; });
+    if (!docs.length) docs = Object.keys(total);
+    return docs.sort(function (a, b) { return total[b] - total[a] || a - b; }).slice(0, MAX_RESULTS);
+  }
+
+  function render(docs, query) {
+    results.textContent = '';
+    if (!docs.length) {
+      const empty = document.createElement('li');
+      empty.className = 'px-4 py-3 text-sm text-slate-500';
+      empty.textContent = '没有找到与“' + query + '”相关的文章';
+      results.appendChild(empty);
+    }
+    docs.forEach(function (doc) {
+      const [url, title, date, summary] = meta.docs[doc];
+      const item = document.createElement('li');
+      const link = document.createElement('a');
+      link.href = url;
+      link.className = 'block px-4 py-3 hover:bg-white/10 transition';
+      const heading = document.createElement('div');
+      heading.className = 'text-sm font-bold text-white';
+      heading.textContent = title;
+      const info = document.createElement('div');
+      info.className = 'mt-1 text-xs text-slate-400 line-clamp-2';
+      info.textContent = (date ? date + ' · ' : '') + summary;
+      link.appendChild(heading);
+      link.appendChild(info);
+      item.appendChild(link);
+      results.appendChild(item);
+    });
+    results.hidden = false;
+  }
+
+  function search(query) {
+    const id = ++queryId;
+    const seen = {};
+    const terms = tokenize(query, true).filter(function (term) {
+      const key = term.join(':');
+      return seen[key] ? false : (seen[key] = true);
+    });
+    if (!terms.length) {
+      results.hidden = true;
+      results.textContent = '';
+      return;
+    }
+    loadMeta().then(function () {
+      return Promise.all(terms.map(function (term) { return loadShard(getShard(term[0])); }));
+    }).then(function (loaded) {
+      if (id !== queryId) return;
+      render(rank(terms.map(function (term, i) { return postings(loaded[i], term); })), query.trim());
+    }).catch(function (e) {
+      console.warn('Search unavailable:', e);
+    });
+  }
+
+  input.addEventListener('focus', function () {
+    loadMeta().catch(function () {});
+  }, { once: true });
+  input.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(function () { search(input.value); }, 150);
+  });
+  input.addEventListener('keydown', function (e) {
+    if (e.key === 'Escape') {
+      input.value = '';
+      search('');
+    }
+  });
+})();
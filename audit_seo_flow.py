@@ -6,7 +6,8 @@ from collections import defaultdict, deque
 from urllib.parse import urlparse, urljoin
 
 # Configuration
-ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Audits the built site (build.py output), not the sources
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.environ.get('BUILD_DIST_DIR', 'dist'))
 BLOG_DIR = os.path.join(ROOT_DIR, 'blog')
 EXTENSIONS = {'.html'}
 
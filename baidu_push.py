@@ -1,56 +1,32 @@
 import urllib.request
 import os
+from changed_urls import CHANGED_URLS_FILE, get_pending, mark_pushed
 
 # 配置信息
 API_URL = "http://data.zz.baidu.com/urls?site=https://gemini-vip.top&token=MkpV4it8Aq1PaVbS"
-HOST = "gemini-vip.top"
 MAX_PUSH_COUNT = 9  # 每天剩余配额预估，保守设置为 9
+PUSH_STATE = '.push_state_baidu.json'
 
 def get_priority_urls():
-    """获取优先级最高的 URL，避免超出配额"""
-    urls = []
+    """获取上次推送之后内容有变化的 URL，优先级最高的在前，避免超出配额"""
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # 1. 必推：核心页面 (仅主页，作为权重核心)
-    priority_pages = ["index.html"]
-    for page in priority_pages:
-        if page == "index.html":
-            urls.append(f"https://{HOST}/")
-            
-    # 1.1 必推：博客聚合页 (权重放大器，必须带斜杠)
-    urls.append(f"https://{HOST}/blog/")
-            
-    # 2. 选推：Blog 页面 (按修改时间排序，推最新的)
-    blog_dir = os.path.join(base_dir, "blog")
-    blog_urls = []
-    if os.path.exists(blog_dir):
-        files = []
-        for file in os.listdir(blog_dir):
-            # 跳过 index.html，因为已在上方作为核心页面添加
-            if file.endswith(".html") and file != "index.html":
-                full_path = os.path.join(blog_dir, file)
-                files.append((full_path, file))
-        
-        # 按修改时间倒序排列
-        files.sort(key=lambda x: os.path.getmtime(x[0]), reverse=True)
-        
-        for _, file in files:
-            # Clean URL: remove .html
-            clean_file = file.replace(".html", "")
-            blog_urls.append(f"https://{HOST}/blog/{clean_file}")
+    # build.py 对比前后两次构建的内容哈希，生成 changed_urls.json。
+    # 文件 mtime 每次构建都会被重置，不能用来判断新旧。
+    # 删除的页面走百度的死链提交，这里只推新增和修改的页面。
+    # 按 feed 的顺序推送：新的在前，同一次构建里新增的文章在修改的前面，
+    # 主页和博客聚合页 (只因列表变化) 排在文章之后。
+    pending = get_pending(os.path.join(base_dir, PUSH_STATE), statuses=('added', 'modified'),
+                          path=os.path.join(base_dir, CHANGED_URLS_FILE))
 
-    # 合并列表
-    urls.extend(blog_urls)
-    
-    # 3. 截断列表，防止超额
-    final_list = urls[:MAX_PUSH_COUNT]
+    # 截断列表，防止超额；剩下的下次再推
+    final_list = pending[:MAX_PUSH_COUNT]
     
     # 打印被舍弃的链接，方便查看
-    if len(urls) > MAX_PUSH_COUNT:
-        print(f"⚠️ 注意：共有 {len(urls)} 个链接，但为了不超配额，只推送前 {MAX_PUSH_COUNT} 个。")
-        print("被暂时忽略的链接：")
-        for ignored in urls[MAX_PUSH_COUNT:]:
-            print(f" - {ignored}")
+    if len(pending) > MAX_PUSH_COUNT:
+        print(f"⚠️ 注意：共有 {len(pending)} 个链接，但为了不超配额，只推送前 {MAX_PUSH_COUNT} 个。")
+        print("被暂时忽略的链接（下次推送）：")
+        for ignored in pending[MAX_PUSH_COUNT:]:
+            print(f" - {ignored['url']}")
             
     return final_list
 
@@ -58,7 +34,7 @@ def push_to_baidu(url_list):
     """提交 URL 到 百度站长平台"""
     if not url_list:
         print("没有需要推送的链接。")
-        return
+        return False
 
     data = "\n".join(url_list).encode("utf-8")
     
@@ -85,16 +61,19 @@ def push_to_baidu(url_list):
             
             if code == 200 and "success" in result:
                 print("✅ 推送成功！")
-            else:
-                print(f"⚠️ 推送可能存在问题，状态码: {code}")
+                return True
+            print(f"⚠️ 推送可能存在问题，状态码: {code}")
                 
     except urllib.error.HTTPError as e:
         print(f"\n❌ 提交失败: {e.code} {e.reason}")
         print(e.read().decode("utf-8"))
     except Exception as e:
         print(f"\n❌ 发生错误: {str(e)}")
+    return False
 
 if __name__ == "__main__":
-    urls = get_priority_urls()
-    if urls:
-        push_to_baidu(urls)
+    entries = get_priority_urls()
+    if not entries:
+        print("自上次推送以来没有内容变化的链接。（先运行 build.py）")
+    elif push_to_baidu([entry['url'] for entry in entries]):
+        mark_pushed(os.path.join(os.path.dirname(os.path.abspath(__file__)), PUSH_STATE), entries)
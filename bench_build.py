@@ -0,0 +1,258 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import resource
+import contextlib
+import subprocess
+from datetime import date, timedelta
+
+import build
+import update_sitemap
+import changed_urls
+
+# Benchmark: the whole build pipeline on synthetic corpora of 1k / 10k / 50k
+# posts generated from the real blog/*.html. Each phase is timed separately
+# and every run is appended to .bench/results.jsonl together with the git
+# revision, so a run can be compared with runs of earlier commits. The build
+# is build.build_site(), the function build.main() runs, on a fresh manifest
+# like a --force build; its phases are timed through the build's profiler
+# hook. node_modules is linked into the corpus, so the stylesheet, icons and
+# font are built from the same packages as the real build.
+#
+#   python3 bench_build.py                       (1000 10000 50000 posts)
+#   python3 bench_build.py --sizes 1000 --jobs 4
+#   python3 bench_build.py --history             (show stored results)
+
+BENCH_DIR = '.bench'
+RESULTS_FILE = os.path.join(BENCH_DIR, 'results.jsonl')
+# Bump when the generator changes, so cached corpora are regenerated
+CORPUS_VERSION = 2
+# Files the phases below read besides blog/*.html and the static files
+CORPUS_FILES = [build.TEMPLATE_FILE, build.ROOT_INDEX_FILE, os.path.join(build.BLOG_DIR, 'index.html'),
+                update_sitemap.SITEMAP_HTML]
+# Left behind by an earlier run; removed so every run is a full build
+BUILD_STATE_FILES = [build.MANIFEST_FILE, update_sitemap.SITEMAP_STATE, changed_urls.CHANGED_URLS_FILE]
+
+KEYWORDS_PATTERN = re.compile(r'(<meta content=")[^"]*(" name="keywords"\s*/?>)|(<meta name="keywords" content=")[^"]*(")')
+TIME_PATTERN = re.compile(r'<time datetime="[^"]*">')
+
+def git_revision():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return rev + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def make_post(source, index, rng, tag_pool):
+    """One synthetic post: a real post with its own title, date and keywords."""
+    content = source.replace('</h1>', f' #{index}</h1>', 1)
+    content = content.replace('<title>', f'<title>#{index} ', 1)
+
+    post_date = date(2023, 1, 1) + timedelta(days=rng.randrange(3 * 365))
+    content = TIME_PATTERN.sub(f'<time datetime="{post_date.isoformat()}">', content, count=1)
+
+    tags = ', '.join(rng.sample(tag_pool, rng.randint(5, 9)))
+    def replace_keywords(m):
+        if m.group(1):
+            return m.group(1) + tags + m.group(2)
+        return m.group(3) + tags + m.group(4)
+    return KEYWORDS_PATTERN.sub(replace_keywords, content, count=1)
+
+def generate_corpus(count, seed=0):
+    """
+    Writes a corpus of count posts to .bench/corpus-<count>/ (reused if it was
+    already generated with the same version and seed) and returns its path.
+    """
+    corpus_dir = os.path.join(BENCH_DIR, f'corpus-{count}')
+    stamp_file = os.path.join(corpus_dir, '.corpus.json')
+    stamp = {'version': CORPUS_VERSION, 'count': count, 'seed': seed}
+    try:
+        with open(stamp_file, 'r', encoding='utf-8') as f:
+            if json.load(f) == stamp:
+                return corpus_dir
+    except (OSError, ValueError):
+        pass
+
+    print(f"Generating {count} posts in {corpus_dir}...")
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    os.makedirs(os.path.join(corpus_dir, build.BLOG_DIR))
+    for path in CORPUS_FILES + [f for f in build.STATIC_FILES if os.path.exists(f)]:
+        shutil.copyfile(path, os.path.join(corpus_dir, path))
+    for directory in build.STATIC_DIRS:
+        shutil.copytree(directory, os.path.join(corpus_dir, directory))
+
+    sources = update_sitemap.read_post_documents()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        real_tags = sorted({tag for filepath, content in sources.items()
+                            for tag in build.get_post_metadata(filepath, content)['tags'] if tag})
+    # Real keywords plus topic tags, so tag overlap stays realistic as the corpus grows
+    tag_pool = real_tags + [f'主题{i}' for i in range(max(10, count // 20))]
+
+    rng = random.Random(seed)
+    seeds = list(sources.items())
+    for i in range(count):
+        filepath, content = seeds[i % len(seeds)]
+        stem = os.path.basename(filepath)[:-5]
+        with open(os.path.join(corpus_dir, build.BLOG_DIR, f'{stem}-{i:05d}.html'), 'w', encoding='utf-8') as f:
+            f.write(make_post(content, i, rng, tag_pool))
+
+    with open(stamp_file, 'w', encoding='utf-8') as f:
+        json.dump(stamp, f)
+    return corpus_dir
+
+def link_node_modules(corpus_dir):
+    link = os.path.join(corpus_dir, 'node_modules')
+    if os.path.isdir('node_modules') and not os.path.lexists(link):
+        os.symlink(os.path.abspath('node_modules'), link)
+
+class PhaseTimer:
+    """
+    Stands in for build.BuildProfiler as build._PROFILER: wall time per phase
+    and per page stage (publish, write), added up over the build, without
+    tracemalloc. Phases are kept in the order the build first enters them.
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        yield
+        self.timings[name] = self.timings.get(name, 0) + time.perf_counter() - start
+
+    def stage(self, filepath, stage):
+        return self.phase(stage)
+
+    def start_page(self, filepath):
+        pass
+
+    def mark(self, stage):
+        pass
+
+def run_build(corpus_dir, jobs, batch_size):
+    """
+    Runs build.build_site() on corpus_dir (full build, fresh manifest) and
+    returns {phase: seconds}. Posts are rendered, published and written in
+    batches of batch_size so 50k rendered pages never sit in memory at once.
+    """
+    timer = PhaseTimer()
+    cwd = os.getcwd()
+    link_node_modules(corpus_dir)
+    os.chdir(corpus_dir)
+    build.RENDER_BATCH = batch_size
+    build._PROFILER = timer
+    try:
+        shutil.rmtree(build.DIST_DIR, ignore_errors=True)
+        for path in BUILD_STATE_FILES:
+            if os.path.exists(path):
+                os.remove(path)
+        template_content = build.get_template()
+        template = build.compile_template(template_content)
+        manifest = {'version': build.MANIFEST_VERSION, 'pages': {}, 'compressed': {}}
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            build.build_site(template_content, template, manifest, jobs)
+            total = time.perf_counter() - start
+    finally:
+        build._PROFILER = None
+        os.chdir(cwd)
+    timings = dict(timer.timings)
+    timings['total'] = total
+    return timings
+
+def load_results():
+    results = []
+    try:
+        with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    results.append(json.loads(line))
+    except OSError:
+        pass
+    return results
+
+def save_result(result):
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+def find_baseline(results, result, baseline_rev=None):
+    """Latest stored run of the same size/jobs/parser from another revision (or baseline_rev)."""
+    for old in reversed(results):
+        if (old['posts'], old['jobs'], old['parser']) != (result['posts'], result['jobs'], result['parser']):
+            continue
+        if baseline_rev and old['rev'].startswith(baseline_rev):
+            return old
+        if not baseline_rev and old['rev'] != result['rev']:
+            return old
+    return None
+
+def print_result(result, baseline):
+    header = f"\n{result['posts']} posts @ {result['rev']} (jobs={result['jobs']}, parser={result['parser']})"
+    if baseline:
+        header += f" vs {baseline['rev']}"
+    print(header)
+    phases = [phase for phase in result['phases'] if phase != 'total']
+    for phase in phases + ['total']:
+        seconds = result['phases'][phase]
+        line = f"  {phase:<24} {seconds:10.3f} s"
+        if baseline and baseline['phases'].get(phase):
+            old = baseline['phases'][phase]
+            line += f" {old:10.3f} s {(seconds - old) / old * 100:+8.1f}%"
+        print(line)
+    print(f"  {'peak RSS':<24} {result['max_rss_mb']:10.1f} MB")
+
+def print_history(results):
+    print(f"{'rev':<16} {'posts':>7} {'jobs':>5} {'parser':<12} {'total s':>9}  recorded")
+    for r in results:
+        print(f"{r['rev']:<16} {r['posts']:>7} {r['jobs']:>5} {r['parser']:<12} {r['phases']['total']:9.2f}  {r['timestamp']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the build pipeline on synthetic corpora.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help='corpus sizes in posts (default: 1000 10000 50000)')
+    parser.add_argument('--jobs', type=int, default=1, help='render workers (default: 1)')
+    parser.add_argument('--batch', type=int, default=1000, help='posts rendered per batch (default: 1000)')
+    parser.add_argument('--seed', type=int, default=0, help='corpus generator seed')
+    parser.add_argument('--compare', metavar='REV', help='compare with the latest run of this revision')
+    parser.add_argument('--no-save', action='store_true', help='do not append the results to ' + RESULTS_FILE)
+    parser.add_argument('--history', action='store_true', help='print the stored results and exit')
+    args = parser.parse_args()
+
+    results = load_results()
+    if args.history:
+        print_history(results)
+        return 0
+
+    rev = git_revision()
+    for count in args.sizes:
+        corpus_dir = generate_corpus(count, args.seed)
+        phases = run_build(corpus_dir, args.jobs, args.batch)
+        result = {
+            'rev': rev,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'posts': count,
+            'jobs': args.jobs,
+            'parser': build.HTML_PARSER,
+            'python': platform.python_version(),
+            'phases': phases,
+            # ru_maxrss is KB on Linux, bytes on macOS
+            'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+        }
+        print_result(result, find_baseline(results, result, args.compare))
+        if not args.no_save:
+            save_result(result)
+            results.append(result)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
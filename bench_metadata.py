@@ -0,0 +1,171 @@
+import os
+import re
+import sys
+import time
+import argparse
+
+import build
+
+# Benchmark: single-pass scan_post_document vs. the old regex battery that
+# get_post_metadata used to run. Checks both give identical metadata on the
+# real posts, then times them on large and minified (single-line) inputs.
+#
+#   python3 bench_metadata.py
+#   python3 bench_metadata.py --sizes 100 200 400 800   (input sizes in KB)
+
+def legacy_get_post_metadata(filepath, content):
+    """The previous get_post_metadata, kept verbatim as the reference."""
+    # Title Priority: <h1> -> <title>
+    h1_match = re.search(r'<h1[^>]*>(.*?)</h1>', content, re.DOTALL)
+    if h1_match:
+        # Remove HTML tags from h1
+        title = re.sub(r'<[^>]+>', '', h1_match.group(1)).strip()
+        # Collapse multiple spaces
+        title = ' '.join(title.split())
+    else:
+        title_match = re.search(r'<title>(.*?)</title>', content)
+        title = title_match.group(1).split(' - ')[0] if title_match else 'No Title'
+    
+    # URL (Clean URL)
+    filename = os.path.basename(filepath)
+    url = filename.replace('.html', '')
+    
+    # Tags
+    tags = []
+    kw_match = re.search(r'<meta.*name="keywords".*content="([^"]*)".*>', content)
+    if not kw_match:
+        kw_match = re.search(r'<meta.*content="([^"]*)".*name="keywords".*>', content)
+    
+    if kw_match:
+        tags = [t.strip() for t in kw_match.group(1).split(',')]
+        
+    # Date
+    date_match = re.search(r'<time datetime="([^"]*)">', content)
+    date = date_match.group(1) if date_match else '1970-01-01'
+    
+    # Content Length for Read Time
+    main_text = ''
+    main_match = re.search(r'<main.*?>(.*?)</main>', content, re.DOTALL)
+    if main_match:
+        main_text = re.sub(r'<[^>]+>', '', main_match.group(1))
+    else:
+        main_text = re.sub(r'<[^>]+>', '', content)
+        
+    text_length = len(main_text.strip())
+    read_time = f"{max(1, text_length // 400)}分钟阅读"
+
+    # Meta tags for Homepage Card
+    # <meta name="card-icon" content="...">
+    card_icon_match = re.search(r'<meta.*name="card-icon".*content="([^"]*)".*>', content)
+    card_icon = card_icon_match.group(1) if card_icon_match else 'fa-star'
+    
+    # <meta name="card-color" content="...">
+    card_color_match = re.search(r'<meta.*name="card-color".*content="([^"]*)".*>', content)
+    card_color = card_color_match.group(1) if card_color_match else 'purple'
+    
+    # <meta name="card-category" content="...">
+    card_category_match = re.search(r'<meta.*name="card-category".*content="([^"]*)".*>', content)
+    card_category = card_category_match.group(1) if card_category_match else '教程'
+    
+    # <meta name="card-sticky" content="0">
+    card_sticky_match = re.search(r'<meta.*name="card-sticky".*content="([^"]*)".*>', content)
+    card_sticky = int(card_sticky_match.group(1)) if card_sticky_match and card_sticky_match.group(1).isdigit() else 0
+
+    # Override with Central Config if available
+    if url in build.POST_CONFIG:
+        config = build.POST_CONFIG[url]
+        card_color = config.get('color', card_color)
+        card_icon = config.get('icon', card_icon)
+        card_category = config.get('category', card_category)
+
+    # Extract Summary from description meta or p tag
+    summary = ''
+    desc_match = re.search(r'<meta.*name="description".*content="([^"]*)".*>', content)
+    if not desc_match:
+        desc_match = re.search(r'<meta.*content="([^"]*)".*name="description".*>', content)
+    if desc_match:
+        summary = desc_match.group(1)
+    
+    return {
+        'title': title,
+        'url': url,
+        'tags': tags,
+        'date': date,
+        'read_time': read_time,
+        'filepath': filepath,
+        'card_icon': card_icon,
+        'card_color': card_color,
+        'card_category': card_category,
+        'card_sticky': card_sticky,
+        'summary': summary
+    }
+
+def minify(content):
+    # Crude single-line minification: the worst case for the old `.*` patterns
+    return re.sub(r'\s*\n\s*', ' ', content)
+
+def inflate(content, target_bytes):
+    # Repeat the body of <main> until the page reaches target_bytes
+    match = re.search(r'(<main.*?>)(.*?)(</main>)', content, re.DOTALL)
+    if not match:
+        return content
+    body = match.group(2)
+    repeats = max(1, target_bytes // max(1, len(body.encode('utf-8'))))
+    return content[:match.start(2)] + body * repeats + content[match.end(2):]
+
+def time_call(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def check_equivalence(documents):
+    mismatches = 0
+    for filepath, content in documents.items():
+        old = legacy_get_post_metadata(filepath, content)
+        new = build.get_post_metadata(filepath, content)
+        if old != new:
+            mismatches += 1
+            diff = {k: (old[k], new[k]) for k in old if old[k] != new[k]}
+            print(f"❌ Mismatch in {filepath}: {diff}")
+    print(f"Equivalence: {len(documents) - mismatches}/{len(documents)} posts identical")
+    return mismatches == 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark post metadata extraction.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 200, 400],
+                        help='synthetic page sizes in KB (default: 50 100 200 400)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    documents = build.update_sitemap.read_post_documents()
+    if not documents:
+        print("No posts found.")
+        return 1
+    ok = check_equivalence(documents)
+
+    total = sum(len(c) for c in documents.values())
+    print(f"\nAll {len(documents)} posts ({total // 1024} KB):")
+    legacy = time_call(lambda: [legacy_get_post_metadata(f, c) for f, c in documents.items()], repeat=args.repeat)
+    scanner = time_call(lambda: [build.get_post_metadata(f, c) for f, c in documents.items()], repeat=args.repeat)
+    print(f"  legacy regex : {legacy * 1000:9.1f} ms")
+    print(f"  single pass  : {scanner * 1000:9.1f} ms")
+
+    # Largest real post as the seed for synthetic inputs
+    seed_path, seed = max(documents.items(), key=lambda item: len(item[1]))
+    print(f"\nSynthetic inputs from {seed_path}:")
+    print(f"  {'size':>8} {'layout':>10} {'legacy ms':>12} {'scan ms':>10} {'speedup':>9}")
+    for size_kb in args.sizes:
+        large = inflate(seed, size_kb * 1024)
+        for layout, content in (('formatted', large), ('minified', minify(large))):
+            legacy = time_call(legacy_get_post_metadata, seed_path, content, repeat=args.repeat)
+            scanner = time_call(build.get_post_metadata, seed_path, content, repeat=args.repeat)
+            print(f"  {size_kb:>6}KB {layout:>10} {legacy * 1000:12.1f} {scanner * 1000:10.1f} {legacy / scanner:8.1f}x")
+
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
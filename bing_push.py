@@ -1,18 +1,31 @@
 import urllib.request
+import argparse
+import gzip
 import json
 import os
+from changed_urls import CHANGED_URLS_FILE, get_pending, mark_pushed
 
 # 配置信息
 HOST = "gemini-vip.top"
 KEY = "b571b53d075d4ba09bc1fc37b9e1da48"
 KEY_LOCATION = f"https://{HOST}/{KEY}.txt"
 API_URL = "https://api.indexnow.org/indexnow"
+# IndexNow 单次最多 10,000 个链接，其余留到下次
+MAX_PUSH_COUNT = 10000
+PUSH_STATE = '.push_state_bing.json'
+
+def read_sitemap(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.read()
 
 def get_all_urls():
     """从 sitemap.xml 提取所有 URL"""
     urls = []
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    sitemap_path = os.path.join(base_dir, 'sitemap.xml')
+    # sitemap.xml is generated by build.py into the dist tree
+    dist_dir = os.path.join(base_dir, os.environ.get('BUILD_DIST_DIR', 'dist'))
+    sitemap_path = os.path.join(dist_dir, 'sitemap.xml')
     
     if not os.path.exists(sitemap_path):
         print(f"❌ 错误: 找不到 sitemap.xml 文件: {sitemap_path}")
@@ -20,21 +33,34 @@ def get_all_urls():
     
     try:
         import re
-        with open(sitemap_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            # 提取 <loc> 标签内容
-            urls = re.findall(r'<loc>(.*?)</loc>', content)
-            # 过滤掉空白字符
-            urls = [url.strip() for url in urls if url.strip()]
-            
-            # 过滤掉 Google 验证文件 (以防万一 sitemap 中包含)
-            urls = [url for url in urls if "google" not in url.split('/')[-1]]
-            
+        content = read_sitemap(sitemap_path)
+        # 大站点: sitemap.xml 是 sitemap index，逐个读取分片
+        if '<sitemapindex' in content:
+            parts = re.findall(r'<loc>.*?/([^/<]+)</loc>', content)
+            content = ''.join(read_sitemap(os.path.join(dist_dir, part)) for part in parts)
+        # 提取 <loc> 标签内容
+        urls = re.findall(r'<loc>(.*?)</loc>', content)
+        # 过滤掉空白字符
+        urls = [url.strip() for url in urls if url.strip()]
+        
+        # 过滤掉 Google 验证文件 (以防万一 sitemap 中包含)
+        urls = [url for url in urls if "google" not in url.split('/')[-1]]
+        
     except Exception as e:
         print(f"❌ 解析 sitemap.xml 失败: {str(e)}")
         
     return urls
 
+def get_changed_urls():
+    """上次推送之后内容有变化的 URL（build.py 生成的 changed_urls.json）"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    # 删除的页面也提交：IndexNow 会重新抓取并发现 404
+    pending = get_pending(os.path.join(base_dir, PUSH_STATE), path=os.path.join(base_dir, CHANGED_URLS_FILE))
+    pending = [entry for entry in pending if "google" not in entry['url'].split('/')[-1]]
+    if len(pending) > MAX_PUSH_COUNT:
+        print(f"⚠️ 共有 {len(pending)} 个变化的链接，本次只推送最新的 {MAX_PUSH_COUNT} 个，其余下次推送。")
+    return pending[:MAX_PUSH_COUNT]
+
 def push_to_bing(url_list):
     """提交 URL 到 Bing IndexNow"""
     data = {
@@ -59,20 +85,32 @@ def push_to_bing(url_list):
     try:
         with urllib.request.urlopen(req) as response:
             code = response.getcode()
-            if code == 200:
+            # 202: 已接收，密钥验证中
+            if code in (200, 202):
                 print("\n✅ 提交成功！Bing 已经收到您的收录请求。")
-            else:
-                print(f"\n⚠️ 提交可能有问题，返回状态码: {code}")
-                print(response.read().decode("utf-8"))
+                return True
+            print(f"\n⚠️ 提交可能有问题，返回状态码: {code}")
+            print(response.read().decode("utf-8"))
     except urllib.error.HTTPError as e:
         print(f"\n❌ 提交失败: {e.code} {e.reason}")
         print(e.read().decode("utf-8"))
     except Exception as e:
         print(f"\n❌ 发生错误: {str(e)}")
+    return False
 
 if __name__ == "__main__":
-    urls = get_all_urls()
-    if urls:
-        push_to_bing(urls)
+    parser = argparse.ArgumentParser(description='Submit changed URLs to Bing IndexNow.')
+    parser.add_argument('--all', action='store_true', help='submit every URL in sitemap.xml instead of the changed ones')
+    args = parser.parse_args()
+    if args.all:
+        urls = get_all_urls()
+        if urls:
+            push_to_bing(urls)
+        else:
+            print("未找到任何 HTML 文件。")
     else:
-        print("未找到任何 HTML 文件。")
+        entries = get_changed_urls()
+        if not entries:
+            print("自上次推送以来没有内容变化的链接。（先运行 build.py；全部重新提交用 --all）")
+        elif push_to_bing([entry['url'] for entry in entries]):
+            mark_pushed(os.path.join(os.path.dirname(os.path.abspath(__file__)), PUSH_STATE), entries)
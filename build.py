@@ -1,12 +1,75 @@
 import os
 import re
+import sys
 import json
-import random
+import io
+import hashlib
+import argparse
+import contextlib
+import collections
+import difflib
+import bisect
+import heapq
+import time
+import tracemalloc
 import update_sitemap
+import search_index
+import stylesheet
+import fonts
+import fingerprint
+import publish
+import critical_css
+import compress
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
+from build_io import DIST_DIR, dist_path, write_file_atomic, copy_file_atomic, remove_file
+from publish import publish_page
 
 TEMPLATE_FILE = 'layout_template.html'
 BLOG_DIR = 'blog'
+ROOT_INDEX_FILE = 'index.html'
+# Persistent record of what each page was last built from (see should_rebuild_page)
+MANIFEST_FILE = '.build_manifest.json'
+MANIFEST_VERSION = 3
+
+# Source files/dirs published to DIST_DIR as-is (pages generated by the build
+# -- blog/, index.html, sitemap.html, sitemap.xml, posts.json -- are not listed)
+STATIC_FILES = [
+    '404.html', 'about.html', 'legal.html', 'googlea685aa8ff3686b48.html',
+    'b571b53d075d4ba09bc1fc37b9e1da48.txt', 'favicon.svg', 'robots.txt',
+    'site.webmanifest', '_headers', '_redirects'
+]
+STATIC_DIRS = ['assets']
+
+# --- HTML Parser Backend ---
+# BUILD_HTML_PARSER / --parser: 'auto' (lxml if installed, else html.parser),
+# 'lxml' or 'html.parser'. Pages and their <main> go through the selected
+# backend; the small snippets we insert into them (CTA, breadcrumb, cards)
+# always use html.parser, since lxml would wrap them in <html><body>.
+# `build.py --check-parser` verifies the backend renders the same site.
+PARSER_CHOICES = ('auto', 'lxml', 'html.parser')
+
+def resolve_html_parser(name):
+    if name == 'auto':
+        try:
+            import lxml  # noqa: F401
+            return 'lxml'
+        except ImportError:
+            return 'html.parser'
+    return name
+
+HTML_PARSER = resolve_html_parser(os.environ.get('BUILD_HTML_PARSER', 'auto'))
+
+def set_html_parser(name):
+    global HTML_PARSER
+    HTML_PARSER = resolve_html_parser(name)
+
+def parse_html(html):
+    return BeautifulSoup(html, HTML_PARSER)
+
+def parse_fragment(html):
+    return BeautifulSoup(html, 'html.parser')
 
 # Configuration Maps
 SHADOW_MAP = {
@@ -108,20 +171,230 @@ def get_template():
     with open(TEMPLATE_FILE, 'r', encoding='utf-8') as f:
         return f.read()
 
-def get_post_metadata(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+# --- Precompiled Layout Template ---
+# layout_template.html is split once into static segments and named slots;
+# each page is then rendered with a single join instead of one str.replace
+# pass over the whole page per placeholder.
+TEMPLATE_SLOTS = ('content', 'title', 'description', 'keywords', 'canonical')
+REQUIRED_TEMPLATE_SLOTS = ('content',)
+TEMPLATE_SLOT_PATTERN = re.compile(r'\{\{\s*([^{}]*?)\s*\}\}')
+
+class TemplateError(ValueError):
+    pass
+
+class CompiledTemplate:
+    def __init__(self, segments, slots):
+        # segments[0] slot[0] segments[1] slot[1] ... segments[-1]
+        self.segments = segments
+        self.slots = slots
+
+    def render(self, values):
+        """Fills every slot from values in one join. Every slot needs a value."""
+        missing = sorted(set(self.slots) - set(values))
+        if missing:
+            raise TemplateError(f"No value for template slot(s): {', '.join(missing)}")
+        parts = [self.segments[0]]
+        for name, segment in zip(self.slots, self.segments[1:]):
+            parts.append(values[name])
+            parts.append(segment)
+        return ''.join(parts)
+
+def compile_template(text, source=TEMPLATE_FILE):
+    """
+    Compiles template text into a CompiledTemplate. Raises TemplateError for
+    unknown placeholders, stray '{{' / '}}' and missing required slots, so a
+    broken template fails the build instead of leaking '{{ }}' into pages.
+    """
+    segments = []
+    slots = []
+    errors = []
+    pos = 0
+    def check_segment(start, end):
+        for marker in ('{{', '}}'):
+            idx = text.find(marker, start, end)
+            if idx != -1:
+                errors.append(f"{source}:{text.count(chr(10), 0, idx) + 1}: unbalanced '{marker}'")
+        segments.append(text[start:end])
+
+    for m in TEMPLATE_SLOT_PATTERN.finditer(text):
+        name = m.group(1)
+        if name not in TEMPLATE_SLOTS:
+            errors.append(f"{source}:{text.count(chr(10), 0, m.start()) + 1}: unknown placeholder {m.group(0)}")
+        check_segment(pos, m.start())
+        slots.append(name)
+        pos = m.end()
+    check_segment(pos, len(text))
+
+    for name in REQUIRED_TEMPLATE_SLOTS:
+        if name not in slots:
+            errors.append(f"{source}: missing required placeholder {{{{ {name} }}}}")
+    for name in TEMPLATE_SLOTS:
+        if name not in slots and name not in REQUIRED_TEMPLATE_SLOTS:
+            print(f"Warning: {source} has no {{{{ {name} }}}} placeholder")
+
+    if errors:
+        raise TemplateError('\n'.join(errors))
+    return CompiledTemplate(segments, slots)
+
+# --- Build Manifest (Incremental Builds) ---
+# Every page is keyed by a hash of everything that can change its output:
+# the build script itself (CTA_HTML, POST_CONFIG, card templates...), the layout
+# template, the page source, its metadata and the metadata of the related-post
+# cards it embeds. If that key matches the manifest and the output in DIST_DIR
+# is still the one we wrote, the page is skipped entirely.
+
+def hash_text(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def hash_document(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def load_build_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return {'version': MANIFEST_VERSION, 'pages': {}}
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read {MANIFEST_FILE} ({e}). Doing a full rebuild.")
+        return {'version': MANIFEST_VERSION, 'pages': {}}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'pages': {}}
+    return manifest
+
+def save_build_manifest(manifest):
+    write_file_atomic(MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True))
+
+def get_config_hash(template_content):
+    # Hashing build.py covers CTA_HTML, POST_CONFIG, the maps and all rendering code
+    with open(os.path.abspath(__file__), 'r', encoding='utf-8') as f:
+        build_source = f.read()
+    return hash_text(build_source, template_content)
+
+def get_page_inputs_hash(config_hash, content, current_post, related_posts):
+    # Only the card fields of related posts end up in the page
+    card_keys = ('url', 'title', 'card_color', 'card_icon', 'card_category')
+    related_cards = [{k: p.get(k) for k in card_keys} for p in related_posts]
+    return hash_text(
+        config_hash,
+        hash_document(content),
+        json.dumps(current_post, ensure_ascii=False, sort_keys=True),
+        json.dumps(related_cards, ensure_ascii=False, sort_keys=True)
+    )
+
+def get_output_path(filepath):
+    # blog/foo.html -> dist/blog/foo.html
+    return dist_path(filepath)
+
+def should_rebuild_page(manifest, filepath, inputs_hash):
+    entry = manifest['pages'].get(filepath)
+    if not entry or entry.get('inputs') != inputs_hash:
+        return True
+    # The output must still be there, untouched (cheap stat, no read)
+    try:
+        return os.path.getsize(get_output_path(filepath)) != entry.get('size')
+    except OSError:
+        return True
+
+def record_built_page(manifest, filepath, new_content, inputs_hash):
+    manifest['pages'][filepath] = {
+        'inputs': inputs_hash,
+        'output': hash_document(new_content),
+        'size': len(new_content.encode('utf-8'))
+    }
+
+def refresh_built_pages(manifest, paths):
+    """Re-records pages rewritten in DIST_DIR after rendering (by publish.republish_pages)."""
+    paths = set(paths)
+    refreshed = False
+    for filepath, entry in manifest['pages'].items():
+        output = get_output_path(filepath)
+        if output in paths:
+            with open(output, 'r', encoding='utf-8') as f:
+                record_built_page(manifest, filepath, f.read(), entry['inputs'])
+            refreshed = True
+    if refreshed:
+        save_build_manifest(manifest)
+
+# --- Single-Pass Metadata Scanner ---
+# One linear walk over the document that only stops at the handful of tags
+# get_post_metadata needs (h1, title, main, meta, time). Replaces a dozen
+# full-document re.search calls whose `<meta.*name=...*content=...` form
+# backtracks quadratically once a page is minified onto a single line.
+SCAN_TAG_PATTERN = re.compile(r'<(/?)(h1|title|main|meta|time)(?=[\s/>])[^>]*>')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+ATTR_PATTERN = re.compile(r'([^\s"\'<>/=]+)\s*=\s*"([^"]*)"')
+SCAN_META_NAMES = ('keywords', 'description', 'card-icon', 'card-color', 'card-category', 'card-sticky', 'card-image')
+
+def scan_post_document(content):
+    """
+    Returns the raw fields of a post in a single pass:
+    title (<title> text), h1 (text of the first <h1>), metas ({name: content}
+    for keywords, description and the card-* metas, first occurrence wins),
+    time (datetime of the first <time datetime="...">) and main_text (text of
+    the first <main>, or of the whole page if there is none). Values are kept
+    raw (entities are not decoded), exactly as they appear in the file.
+    """
+    fields = {'title': None, 'h1': None, 'metas': {}, 'time': None, 'main_text': None}
+    h1_start = title_start = main_start = None
+
+    for m in SCAN_TAG_PATTERN.finditer(content):
+        closing, name = m.group(1), m.group(2)
+
+        if name == 'h1':
+            if not closing and fields['h1'] is None and h1_start is None:
+                h1_start = m.end()
+            elif closing and h1_start is not None:
+                fields['h1'] = TAG_PATTERN.sub('', content[h1_start:m.start()])
+                h1_start = None
+        elif name == 'title':
+            if not closing and m.group(0) == '<title>' and fields['title'] is None:
+                title_start = m.end()
+            elif closing and title_start is not None:
+                title = content[title_start:m.start()]
+                # A <title> split over several lines never matched the old pattern
+                if '\n' not in title:
+                    fields['title'] = title
+                title_start = None
+        elif name == 'main':
+            if not closing and fields['main_text'] is None and main_start is None:
+                main_start = m.end()
+            elif closing and main_start is not None:
+                fields['main_text'] = TAG_PATTERN.sub('', content[main_start:m.start()])
+                main_start = None
+        elif name == 'meta':
+            attrs = dict(ATTR_PATTERN.findall(m.group(0)))
+            meta_name = attrs.get('name')
+            if meta_name in SCAN_META_NAMES and 'content' in attrs and meta_name not in fields['metas']:
+                fields['metas'][meta_name] = attrs['content']
+        elif name == 'time' and not closing and fields['time'] is None:
+            attrs = dict(ATTR_PATTERN.findall(m.group(0)))
+            if 'datetime' in attrs:
+                fields['time'] = attrs['datetime']
+
+    if fields['main_text'] is None:
+        # Same fallback as before: all text of the document
+        fields['main_text'] = TAG_PATTERN.sub('', content)
+    return fields
+
+def get_post_metadata(filepath, content=None):
+    if content is None:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+    
+    fields = scan_post_document(content)
+    metas = fields['metas']
     
     # Title Priority: <h1> -> <title>
-    h1_match = re.search(r'<h1[^>]*>(.*?)</h1>', content, re.DOTALL)
-    if h1_match:
-        # Remove HTML tags from h1
-        title = re.sub(r'<[^>]+>', '', h1_match.group(1)).strip()
-        # Collapse multiple spaces
-        title = ' '.join(title.split())
+    if fields['h1'] is not None:
+        # Collapse multiple spaces (tags were already stripped by the scanner)
+        title = ' '.join(fields['h1'].split())
     else:
-        title_match = re.search(r'<title>(.*?)</title>', content)
-        title = title_match.group(1).split(' - ')[0] if title_match else 'No Title'
+        title = fields['title'].split(' - ')[0] if fields['title'] is not None else 'No Title'
     
     # URL (Clean URL)
     filename = os.path.basename(filepath)
@@ -129,44 +402,21 @@ def get_post_metadata(filepath):
     
     # Tags
     tags = []
-    kw_match = re.search(r'<meta.*name="keywords".*content="([^"]*)".*>', content)
-    if not kw_match:
-        kw_match = re.search(r'<meta.*content="([^"]*)".*name="keywords".*>', content)
-    
-    if kw_match:
-        tags = [t.strip() for t in kw_match.group(1).split(',')]
+    if 'keywords' in metas:
+        tags = [t.strip() for t in metas['keywords'].split(',')]
         
     # Date
-    date_match = re.search(r'<time datetime="([^"]*)">', content)
-    date = date_match.group(1) if date_match else '1970-01-01'
+    date = fields['time'] if fields['time'] is not None else '1970-01-01'
     
     # Content Length for Read Time
-    main_text = ''
-    main_match = re.search(r'<main.*?>(.*?)</main>', content, re.DOTALL)
-    if main_match:
-        main_text = re.sub(r'<[^>]+>', '', main_match.group(1))
-    else:
-        main_text = re.sub(r'<[^>]+>', '', content)
-        
-    text_length = len(main_text.strip())
+    text_length = len(fields['main_text'].strip())
     read_time = f"{max(1, text_length // 400)}分钟阅读"
 
     # Meta tags for Homepage Card
-    # <meta name="card-icon" content="...">
-    card_icon_match = re.search(r'<meta.*name="card-icon".*content="([^"]*)".*>', content)
-    card_icon = card_icon_match.group(1) if card_icon_match else 'fa-star'
-    
-    # <meta name="card-color" content="...">
-    card_color_match = re.search(r'<meta.*name="card-color".*content="([^"]*)".*>', content)
-    card_color = card_color_match.group(1) if card_color_match else 'purple'
-    
-    # <meta name="card-category" content="...">
-    card_category_match = re.search(r'<meta.*name="card-category".*content="([^"]*)".*>', content)
-    card_category = card_category_match.group(1) if card_category_match else '教程'
-    
-    # <meta name="card-sticky" content="0">
-    card_sticky_match = re.search(r'<meta.*name="card-sticky".*content="([^"]*)".*>', content)
-    card_sticky = int(card_sticky_match.group(1)) if card_sticky_match and card_sticky_match.group(1).isdigit() else 0
+    card_icon = metas.get('card-icon', 'fa-star')
+    card_color = metas.get('card-color', 'purple')
+    card_category = metas.get('card-category', '教程')
+    card_sticky = int(metas['card-sticky']) if metas.get('card-sticky', '').isdigit() else 0
 
     # Override with Central Config if available
     if url in POST_CONFIG:
@@ -175,13 +425,8 @@ def get_post_metadata(filepath):
         card_icon = config.get('icon', card_icon)
         card_category = config.get('category', card_category)
 
-    # Extract Summary from description meta or p tag
-    summary = ''
-    desc_match = re.search(r'<meta.*name="description".*content="([^"]*)".*>', content)
-    if not desc_match:
-        desc_match = re.search(r'<meta.*content="([^"]*)".*name="description".*>', content)
-    if desc_match:
-        summary = desc_match.group(1)
+    # Extract Summary from description meta
+    summary = metas.get('description', '')
     
     return {
         'title': title,
@@ -197,69 +442,95 @@ def get_post_metadata(filepath):
         'summary': summary
     }
 
-# Global state to track recommendation frequency for SEO balancing
-INCOMING_LINK_COUNTS = {}
-
-def get_related_posts(current_post, all_posts):
-    # Filter out current post
-    candidates = [p for p in all_posts if p['url'] != current_post['url']]
-    
-    scored_candidates = []
-    current_tags = set(current_post['tags'])
-    
-    for p in candidates:
-        other_tags = set(p['tags'])
-        overlap = len(current_tags.intersection(other_tags))
+class RelatedPostsIndex:
+    """
+    Picks related posts for every page from indexes built once per build,
+    instead of scoring and sorting every other post for every page.
+
+    Ranking (unchanged): most shared tags first, then the post recommended the
+    fewest times so far (link_counts, for SEO balancing), then the newest, then
+    the earlier post in all_posts.
+    - tag -> posts inverted index: only posts sharing a tag get an overlap score
+    - overlap levels: within a level the top k come from a heap, not a sort
+    - count buckets ({times recommended: sorted date ranks}) fill up the
+      remaining slots from posts with no shared tag, cheapest count first
+    """
+    def __init__(self, all_posts):
+        self.posts = all_posts
+        self.link_counts = {}
+        self.tag_index = {}
+        self.url_indices = {}
+        for i, post in enumerate(all_posts):
+            for tag in set(post['tags']):
+                self.tag_index.setdefault(tag, []).append(i)
+            self.url_indices.setdefault(post['url'], []).append(i)
+            self.link_counts[post['url']] = 0
         
-        # Initialize count if not exists
-        if p['url'] not in INCOMING_LINK_COUNTS:
-            INCOMING_LINK_COUNTS[p['url']] = 0
-            
-        scored_candidates.append({
-            'post': p,
-            'overlap': overlap
-        })
-    
-    # Intelligent SEO Sorting Strategy:
-    # 1. Relevance (Overlap): High overlap is still the most important factor.
-    # 2. Balance (Incoming Links): If overlap is same, prioritize posts with FEWER incoming links.
-    #    This ensures "wealth distribution" so new or niche posts get visibility.
-    # 3. Freshness (Date): If everything else is equal, prefer newer content.
-    # 4. Randomness: Add a tiny bit of random shuffle for same-score items to avoid static patterns? 
-    #    (Python's sort is stable, so we rely on the keys)
-    
-    scored_candidates.sort(key=lambda x: (
-        x['overlap'],                       # Primary: Relevance
-        -INCOMING_LINK_COUNTS[x['post']['url']], # Secondary: Balance (Less links = Higher priority? Wait, we want fewer links to be higher. So negative count is bad? No.)
-        # Sort is ascending by default? No, we used reverse=True before.
-        # Let's standardize to reverse=True (Descending score).
-        # We want: Higher Overlap -> Higher Score
-        # We want: Lower Link Count -> Higher Score
-        # We want: Newer Date -> Higher Score
-        x['post']['date']
-    ), reverse=True)
-    
-    # Wait, the logic above for Link Count is tricky with reverse=True.
-    # If reverse=True:
-    #   Overlap 3 > Overlap 1 (Good)
-    #   Link Count 5 vs Link Count 20. We want 5 to be picked.
-    #   If we use -Count: -5 > -20. So -Count works with reverse=True.
-    
-    # Refined Sort Key:
-    scored_candidates.sort(key=lambda x: (
-        x['overlap'],                               # 1. Relevance (High is good)
-        -INCOMING_LINK_COUNTS[x['post']['url']],    # 2. Balance (Low count -> High negative number? No. Low count 0 -> 0. High count 10 -> -10. 0 > -10. So Yes, -Count works.)
-        x['post']['date']                           # 3. Freshness (Newer is string-larger usually)
-    ), reverse=True)
-    
-    # Select top 4
-    selected = [x['post'] for x in scored_candidates[:4]]
-    
-    # Update global counts
-    for p in selected:
-        INCOMING_LINK_COUNTS[p['url']] += 1
+        # rank: position when sorted newest first (stable, so ties keep all_posts order)
+        self.by_rank = sorted(range(len(all_posts)), key=lambda i: all_posts[i]['date'], reverse=True)
+        self.rank = [0] * len(all_posts)
+        for r, i in enumerate(self.by_rank):
+            self.rank[i] = r
+        self.count_buckets = {0: list(range(len(all_posts)))} if all_posts else {}
+
+    def _sort_key(self, i):
+        return (self.link_counts[self.posts[i]['url']], self.rank[i])
+
+    def _recommend(self, url):
+        count = self.link_counts[url]
+        self.link_counts[url] = count + 1
+        for i in self.url_indices[url]:
+            bucket = self.count_buckets[count]
+            del bucket[bisect.bisect_left(bucket, self.rank[i])]
+            if not bucket:
+                del self.count_buckets[count]
+            bisect.insort(self.count_buckets.setdefault(count + 1, []), self.rank[i])
+
+    def select(self, post_index, k=4):
+        """Picks k related posts for all_posts[post_index] and counts them as recommended."""
+        current = self.posts[post_index]
+        excluded = set(self.url_indices[current['url']])
         
-    return selected
+        overlaps = {}
+        for tag in set(current['tags']):
+            for i in self.tag_index[tag]:
+                if i not in excluded:
+                    overlaps[i] = overlaps.get(i, 0) + 1
+        levels = {}
+        for i, overlap in overlaps.items():
+            levels.setdefault(overlap, []).append(i)
+        
+        selected = []
+        for overlap in sorted(levels, reverse=True):
+            if len(selected) == k:
+                break
+            selected.extend(heapq.nsmallest(k - len(selected), levels[overlap], key=self._sort_key))
+        
+        if len(selected) < k:
+            for count in sorted(self.count_buckets):
+                for r in self.count_buckets[count]:
+                    i = self.by_rank[r]
+                    if i in excluded or i in overlaps:
+                        continue
+                    selected.append(i)
+                    if len(selected) == k:
+                        break
+                if len(selected) == k:
+                    break
+        
+        for i in selected:
+            self._recommend(self.posts[i]['url'])
+        return [self.posts[i] for i in selected]
+
+def assign_related_posts(all_posts):
+    """
+    Phase 1 of the build: computes the related posts of every page up front,
+    in a fixed order (all_posts is sorted by filename), so the assignment no
+    longer depends on the order pages happen to be rendered in.
+    Returns {url: [related post, ...]}.
+    """
+    index = RelatedPostsIndex(all_posts)
+    return {post['url']: index.select(i) for i, post in enumerate(all_posts)}
 
 def generate_related_posts_html(related_posts, style_db):
     if not related_posts:
@@ -352,9 +623,9 @@ def sanitize_links(html_content):
     
     return html_content
 
-def update_indices():
+def update_indices(documents=None):
     print("Updating indices...")
-    update_sitemap.main()
+    update_sitemap.main(documents)
 
 def optimize_sales_card(soup):
     """
@@ -735,7 +1006,7 @@ def inject_cta_banner(soup):
     if soup.find(id="cta-banner"):
         return soup
 
-    cta_soup = BeautifulSoup(CTA_HTML, 'html.parser')
+    cta_soup = parse_fragment(CTA_HTML)
     
     # 策略 A: 标准模式 (找 header)
     article = soup.find('article')
@@ -764,41 +1035,276 @@ def inject_cta_banner(soup):
     print("  [Warning] No suitable location found for CTA banner.")
     return soup
 
-def process_file(filepath, template_content, all_posts):
-    print(f"Processing file: {filepath}")
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        print(f"Error reading {filepath}: {e}")
-        return
+# --- Structured Head Model ---
+# render_post used to run ~25 re.sub / str.replace passes over the whole page,
+# each copying the full document. Instead the <head> is split into a list of
+# nodes (tags, <title>/<script>/<style> blocks, comments, text) that every rule
+# edits in place; the head is serialized once. Rules match whole nodes, so a
+# pattern never has to scan the body.
+HEAD_NODE_PATTERN = re.compile(
+    r'<script\b[^>]*>.*?</script>|<style\b[^>]*>.*?</style>|<title>.*?</title>'
+    r'|<!--.*?-->|<[^>]+>|[^<]+|<',
+    re.DOTALL
+)
+LD_JSON_PATTERN = r'<script type="application/ld\+json">.*?</script>'
+PAGE_REST_PATTERN = re.compile(LD_JSON_PATTERN, re.DOTALL)
+
+class PageHead:
+    def __init__(self, head_html):
+        self.nodes = HEAD_NODE_PATTERN.findall(head_html)
+
+    def _compile(self, pattern):
+        return re.compile(pattern, re.DOTALL) if isinstance(pattern, str) else pattern
+
+    def find(self, pattern):
+        """First node matching pattern as a whole (re.Match), or None."""
+        regex = self._compile(pattern)
+        for node in self.nodes:
+            m = regex.fullmatch(node)
+            if m:
+                return m
+        return None
+
+    def get_meta(self, name):
+        """content of the first <meta name="..."> (any attribute order), or None."""
+        for node in self.nodes:
+            if node.startswith('<meta'):
+                attrs = dict(ATTR_PATTERN.findall(node))
+                if attrs.get('name') == name and 'content' in attrs:
+                    return attrs['content']
+        return None
+
+    def remove(self, pattern):
+        regex = self._compile(pattern)
+        self.nodes = [node for node in self.nodes if not regex.fullmatch(node)]
+
+    def replace(self, pattern, new_node):
+        regex = self._compile(pattern)
+        self.nodes = [new_node if regex.fullmatch(node) else node for node in self.nodes]
+
+    def append(self, html):
+        """Adds html at the end of the head, right before </head>."""
+        self.nodes.append(html)
+
+    def serialize(self):
+        return ''.join(self.nodes)
+
+def split_page_head(html):
+    """
+    Splits a page into (text up to and including <head>, PageHead, text from
+    </head> on). A page without a head gets an empty model.
+    """
+    start = html.find('<head>')
+    end = html.find('</head>')
+    if start == -1 or end < start:
+        return '', PageHead(''), html
+    start += len('<head>')
+    return html[:start], PageHead(html[start:end]), html[end:]
+
+def finalize_page_rest(html):
+    # Single pass over everything after the head: drop JSON-LD blocks (the
+    # page's schema lives in the head).
+    return PAGE_REST_PATTERN.sub('', html)
+
+# --- Build Profiling (--profile) ---
+# Per-page, per-stage wall time and allocations (tracemalloc). render_post
+# calls profile_mark(stage) after each stage; every mark records the time and
+# memory since the previous one. Disabled (no-ops) unless main() installs a
+# BuildProfiler.
+PROFILE_FILE = 'build_profile.json'
+_PROFILER = None
+
+class BuildProfiler:
+    def __init__(self):
+        self.phases = {}
+        self.pages = {}
+        self.page = None
+        self.max_peak = 0
+        tracemalloc.start()
+        self._reset()
+
+    def _reset(self):
+        self.last_time = time.perf_counter()
+        self.last_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def _measure(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.max_peak = max(self.max_peak, peak)
+        sample = {
+            'ms': round((time.perf_counter() - self.last_time) * 1000, 3),
+            'alloc_kb': round((current - self.last_memory) / 1024, 1),
+            'peak_kb': round((peak - self.last_memory) / 1024, 1),
+        }
+        self._reset()
+        return sample
+
+    def start_page(self, filepath):
+        self.page = self.pages.setdefault(filepath, {})
+        self._reset()
+
+    def mark(self, stage):
+        if self.page is not None:
+            self.page[stage] = self._measure()
+
+    @contextlib.contextmanager
+    def stage(self, filepath, stage):
+        self.page = self.pages.setdefault(filepath, {})
+        self._reset()
+        yield
+        self.mark(stage)
+        self.page = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        # Measured on its own: page marks inside the phase reset the baseline
+        self.page = None
+        self._reset()
+        start_time, start_memory, self.max_peak = self.last_time, self.last_memory, 0
+        yield
+        current, peak = tracemalloc.get_traced_memory()
+        # A phase entered more than once (render_posts, per batch) adds up
+        previous = self.phases.get(name, {'ms': 0, 'alloc_kb': 0, 'peak_kb': 0})
+        self.phases[name] = {
+            'ms': round(previous['ms'] + (time.perf_counter() - start_time) * 1000, 3),
+            'alloc_kb': round(previous['alloc_kb'] + (current - start_memory) / 1024, 1),
+            'peak_kb': max(previous['peak_kb'], round((max(self.max_peak, peak) - start_memory) / 1024, 1)),
+        }
+        self._reset()
+
+    def report(self):
+        pages = {}
+        stage_totals = {}
+        for filepath, stages in self.pages.items():
+            pages[filepath] = {'total_ms': round(sum(s['ms'] for s in stages.values()), 3), 'stages': stages}
+            for stage, sample in stages.items():
+                total = stage_totals.setdefault(stage, {'ms': 0, 'alloc_kb': 0})
+                total['ms'] = round(total['ms'] + sample['ms'], 3)
+                total['alloc_kb'] = round(total['alloc_kb'] + sample['alloc_kb'], 1)
+        return {
+            'parser': HTML_PARSER,
+            'phases': self.phases,
+            'stage_totals': stage_totals,
+            'pages': pages,
+        }
+
+    def stop(self):
+        tracemalloc.stop()
+
+def profile_mark(stage):
+    if _PROFILER:
+        _PROFILER.mark(stage)
+
+def profile_phase(name):
+    return _PROFILER.phase(name) if _PROFILER else contextlib.nullcontext()
+
+def profile_stage(filepath, stage):
+    return _PROFILER.stage(filepath, stage) if _PROFILER else contextlib.nullcontext()
+
+def print_profile_summary(report, top):
+    print(f"\n--- Profile (wall ms, tracemalloc on; backend {report['parser']}) ---")
+    for name, sample in report['phases'].items():
+        print(f"  {name:<28} {sample['ms']:10.1f} ms {sample['peak_kb']:10.1f} KB peak")
+    print("\n  Stage totals over all pages:")
+    for stage, total in sorted(report['stage_totals'].items(), key=lambda item: -item[1]['ms']):
+        print(f"  {stage:<28} {total['ms']:10.1f} ms {total['alloc_kb']:10.1f} KB kept")
+    slowest = sorted(report['pages'].items(), key=lambda item: -item[1]['total_ms'])[:top]
+    print(f"\n  Top {len(slowest)} slowest pages:")
+    for filepath, page in slowest:
+        stage, sample = max(page['stages'].items(), key=lambda item: item[1]['ms'])
+        print(f"  {page['total_ms']:8.1f} ms  {filepath}  (slowest stage: {stage} {sample['ms']:.1f} ms)")
+
+def get_template_values(current_post, main_content, src_title, src_desc, src_kw, src_canon):
+    """Values for the layout template slots of one page."""
+    var_title = ''
+    var_desc = ''
+    var_kw = ''
+    var_canon = ''
     
+    if current_post:
+        var_title = current_post['title']
+        var_desc = current_post['summary']
+        if current_post['tags']:
+            var_kw = ', '.join(current_post['tags'])
+        var_canon = f"https://gemini-vip.top/blog/{current_post['url']}"
+    else:
+        # Fallback for pages not in all_posts (like index.html)
+        if src_title:
+            var_title = src_title.group(1).split(' - ')[0]
+        if src_desc:
+            var_desc = src_desc.group(1)
+        if src_kw:
+            # Extract content from src_kw tag
+            m = re.search(r'content="([^"]*)"', src_kw.group(0))
+            if m: var_kw = m.group(1)
+        if src_canon:
+            m = re.search(r'href="([^"]*)"', src_canon.group(0))
+            if m: var_canon = m.group(1)
+
+    # Every slot gets a value (empty if the page has none), so no '{{ }}' can
+    # reach the output.
+    values = {
+        'content': main_content,
+        'title': var_title,
+        'description': var_desc,
+        'keywords': var_kw,
+    }
+        
+    if var_canon:
+        # Ensure canonical is full URL or absolute path
+        if not var_canon.startswith('http'):
+             if not var_canon.startswith('/'):
+                 var_canon = '/' + var_canon
+             var_canon = f"https://gemini-vip.top{var_canon}"
+        values['canonical'] = var_canon
+    else:
+         # Fallback to current URL if no canonical provided
+         if current_post:
+             values['canonical'] = f"https://gemini-vip.top/blog/{current_post['url']}"
+         else:
+             values['canonical'] = ''
+
+    return values
+
+def render_post(filepath, content, template, current_post, related_posts):
+    """
+    Turns the source of one post into the final page (template is a
+    CompiledTemplate). Pure function of its
+    arguments (no file I/O, no shared state), so pages can be rendered in
+    any order or in worker processes. Returns None if the page has no <main>.
+    """
+    if _PROFILER:
+        _PROFILER.start_page(filepath)
     match = re.search(r'(<main.*?>.*?</main>)', content, re.DOTALL)
     if match:
         print(f"DEBUG: Found <main> in {filepath}")
     else:
         print(f"Warning: No <main> tag found in {filepath}. Skipping content injection.")
-        return
+        return None
     
     # Use BS to clean up the main content first
     try:
         main_content_raw = match.group(1)
-        soup = BeautifulSoup(main_content_raw, 'html.parser')
+        soup = parse_html(main_content_raw)
         print(f"DEBUG: Soup parsed for {filepath}")
+        profile_mark('parse')
         
         # --- Optimize Sales Card ---
         soup = optimize_sales_card(soup)
+        profile_mark('optimize_sales_card')
         
         # --- Enforce SEO Rules (New) ---
         soup = enforce_seo_rules(soup)
+        profile_mark('enforce_seo_rules')
         
         # =========== 新增：插入 CTA 卡片 ===========
         soup = inject_cta_banner(soup)
+        profile_mark('inject_cta_banner')
         # ========================================
         
     except Exception as e:
         print(f"Error parsing soup for {filepath}: {e}")
-        return
+        return None
     
     # --- Remove Category Badge ---
     # Find the header inside article
@@ -815,7 +1321,6 @@ def process_file(filepath, template_content, all_posts):
             inner_breadcrumb = header.find('nav', attrs={'aria-label': 'Breadcrumb'})
             if not inner_breadcrumb:
                 # Restore the inner breadcrumb
-                current_post = next((p for p in all_posts if p['filepath'] == filepath), None)
                 post_title = current_post['title'] if current_post else '文章详情'
                 
                 # Using the exact same structure as the reference code (指令.md)
@@ -831,7 +1336,7 @@ def process_file(filepath, template_content, all_posts):
                 </ol>
                 </nav>
                 '''
-                header.insert(0, BeautifulSoup(inner_bc_html, 'html.parser'))
+                header.insert(0, parse_fragment(inner_bc_html))
             else:
                 # If it exists, ensure it matches the reference style (reset classes)
                 # Remove all styling hacks we added previously, add mt-12
@@ -855,6 +1360,7 @@ def process_file(filepath, template_content, all_posts):
                              pass # keep it
                         else:
                              last_li['aria-current'] = 'page'
+    profile_mark('breadcrumbs')
                 
     # --- Aggressive Cleanup (The Cleaner) ---
     # Strategy: Keep the main content wrapper, remove everything else in <main>.
@@ -889,6 +1395,7 @@ def process_file(filepath, template_content, all_posts):
         main_content = str(soup)
         if '<html>' in main_content:
              main_content = soup.find('body').decode_contents() if soup.find('body') else main_content
+    profile_mark('cleanup')
     
     # --- Dynamic Breadcrumbs Injection (DISABLED) ---
     # current_post = next((p for p in all_posts if p['filepath'] == filepath), None)
@@ -916,10 +1423,8 @@ def process_file(filepath, template_content, all_posts):
     
     # --- Auto Related Posts Injection ---
     # Optimized style to match the screenshot (minimalist, colorful icons, dark background)
-    current_post = next((p for p in all_posts if p['filepath'] == filepath), None)
-    
     if current_post:
-        related_posts = get_related_posts(current_post, all_posts)
+        related_posts = related_posts or []
         print(f"DEBUG: {filepath} has {len(related_posts)} related posts")
         
         # New card style generation
@@ -933,7 +1438,6 @@ def process_file(filepath, template_content, all_posts):
              if color == 'purple' and icon == 'fa-star':
                  # Cycle through a few nice dark gradients based on hash
                  gradients_list = ['blue', 'emerald', 'orange', 'pink', 'cyan', 'violet']
-                 import hashlib
                  idx = int(hashlib.md5(p['title'].encode()).hexdigest(), 16) % len(gradients_list)
                  color = gradients_list[idx]
                  
@@ -970,78 +1474,86 @@ def process_file(filepath, template_content, all_posts):
         if last_main_idx != -1:
             main_content = main_content[:last_main_idx] + '\n' + related_html + '\n' + main_content[last_main_idx:]
             print(f"DEBUG: Injected related posts into {filepath}")
+    profile_mark('related_posts')
     # ------------------------------------
     
-    new_content = template_content.replace('{{ content }}', main_content)
+    source_head = split_page_head(content)[1]
+    src_title = source_head.find(r'<title>(.*?)</title>')
+    src_desc = source_head.find(r'<meta content="([^"]*)" name="description"/>')
+    if not src_desc:
+        src_desc = source_head.find(r'<meta name="description" content="([^"]*)"/>')
+    
+    src_kw = source_head.find(r'<meta content="([^"]*)" name="keywords"/>')
+    if not src_kw:
+        src_kw = source_head.find(r'<meta name="keywords" content="([^"]*)"/>')
+        
+    src_canon = source_head.find(r'<link href="([^"]*)" rel="canonical"/>')
+    
+    values = get_template_values(current_post, main_content, src_title, src_desc, src_kw, src_canon)
+    new_content = template.render(values)
+    profile_mark('template')
     new_content = sanitize_links(new_content)
+    profile_mark('sanitize_links')
+    
+    # All head rules below edit the structured head model; the page is
+    # serialized once at the end.
+    page_start, head, page_rest = split_page_head(new_content)
     
     # --- Meta Tags Deep Cleaning ---
     # 1. Remove ecommerce trash
-    new_content = re.sub(r'<meta content="[^"]*" name="price"/>', '', new_content)
-    new_content = re.sub(r'<meta content="[^"]*" name="currency"/>', '', new_content)
-    new_content = re.sub(r'<meta content="[^"]*" name="availability"/>', '', new_content)
+    head.remove(r'<meta content="[^"]*" name="price"/>')
+    head.remove(r'<meta content="[^"]*" name="currency"/>')
+    head.remove(r'<meta content="[^"]*" name="availability"/>')
     
     # 2. Fix Robots
-    new_content = re.sub(r'<meta content="index,follow" name="robots"/>', '', new_content)
-    new_content = re.sub(r'<meta content="all" name="robots" />', '', new_content)
-    if '</head>' in new_content:
-        new_content = new_content.replace('</head>', '<meta content="index, follow, max-image-preview:large" name="robots"/>\n</head>')
+    head.remove(r'<meta content="index,follow" name="robots"/>')
+    head.remove(r'<meta content="all" name="robots" />')
+    head.append('<meta content="index, follow, max-image-preview:large" name="robots"/>\n')
 
     # 3. Remove Baidu Site Verification from Sub-pages (Blog Posts)
-    new_content = re.sub(r'<meta[^>]*name="baidu-site-verification"[^>]*/>', '', new_content)
+    head.remove(r'<meta[^>]*name="baidu-site-verification"[^>]*/>')
 
     # 4. Smart Fallback for Social Media (OG/Twitter)
-    new_content = re.sub(r'<meta content="website" property="og:type"/>', '<meta content="article" property="og:type"/>', new_content)
+    head.replace(r'<meta content="website" property="og:type"/>', '<meta content="article" property="og:type"/>')
     
     if current_post:
         post_url = f"https://gemini-vip.top/blog/{current_post['url']}"
-        new_content = re.sub(r'<meta content="[^"]*" property="og:url"/>', f'<meta content="{post_url}" property="og:url"/>', new_content)
+        head.replace(r'<meta content="[^"]*" property="og:url"/>', f'<meta content="{post_url}" property="og:url"/>')
         
-        new_content = re.sub(r'<link href="[^"]*" hreflang="zh-CN" rel="alternate"/>', f'<link href="{post_url}" hreflang="zh-CN" rel="alternate"/>', new_content)
+        head.replace(r'<link href="[^"]*" hreflang="zh-CN" rel="alternate"/>', f'<link href="{post_url}" hreflang="zh-CN" rel="alternate"/>')
         
-        card_image_match = re.search(r'<meta.*name="card-image".*content="([^"]*)".*>', content)
-        og_image = card_image_match.group(1) if card_image_match else 'https://gemini-vip.top/assets/logo.png'
+        og_image = source_head.get_meta('card-image') or 'https://gemini-vip.top/assets/logo.png'
         
-        new_content = re.sub(r'<meta content="[^"]*" property="og:image"/>', f'<meta content="{og_image}" property="og:image"/>', new_content)
-        new_content = re.sub(r'<meta content="[^"]*" name="twitter:image"/>', f'<meta content="{og_image}" name="twitter:image"/>', new_content)
+        head.replace(r'<meta content="[^"]*" property="og:image"/>', f'<meta content="{og_image}" property="og:image"/>')
+        head.replace(r'<meta content="[^"]*" name="twitter:image"/>', f'<meta content="{og_image}" name="twitter:image"/>')
         
         article_meta = f'''
     <meta property="article:published_time" content="{current_post['date']}" />
     <meta property="article:author" content="Gemini-VIP" />
     <meta property="article:section" content="{current_post['card_category']}" />
     '''
-        new_content = new_content.replace('</head>', f'{article_meta}\n</head>')
+        head.append(f'{article_meta}\n')
 
-    src_title = re.search(r'<title>(.*?)</title>', content)
-    src_desc = re.search(r'<meta content="([^"]*)" name="description"/>', content)
-    if not src_desc:
-        src_desc = re.search(r'<meta name="description" content="([^"]*)"/>', content)
-    
-    src_kw = re.search(r'<meta content="([^"]*)" name="keywords"/>', content)
-    if not src_kw:
-        src_kw = re.search(r'<meta name="keywords" content="([^"]*)"/>', content)
-        
-    src_canon = re.search(r'<link href="([^"]*)" rel="canonical"/>', content)
-    
     if src_title:
-        new_content = re.sub(r'<title>.*?</title>', src_title.group(0), new_content)
+        head.replace(r'<title>.*?</title>', src_title.group(0))
     
     if src_desc:
-        new_content = re.sub(r'<meta content="[^"]*" name="description"/>', src_desc.group(0), new_content)
-        new_content = re.sub(r'<meta name="description" content="[^"]*"/>', src_desc.group(0), new_content)
+        head.replace(r'<meta content="[^"]*" name="description"/>', src_desc.group(0))
+        head.replace(r'<meta name="description" content="[^"]*"/>', src_desc.group(0))
         
     if src_kw:
-        new_content = re.sub(r'<meta content="[^"]*" name="keywords"/>', src_kw.group(0), new_content)
-        new_content = re.sub(r'<meta name="keywords" content="[^"]*"/>', src_kw.group(0), new_content)
+        head.replace(r'<meta content="[^"]*" name="keywords"/>', src_kw.group(0))
+        head.replace(r'<meta name="keywords" content="[^"]*"/>', src_kw.group(0))
         
     if src_canon:
         canon_tag = src_canon.group(0)
         if '.html' in canon_tag:
             canon_tag = canon_tag.replace('.html', '')
-        new_content = re.sub(r'<link href="[^"]*" rel="canonical"/>', canon_tag, new_content)
+        head.replace(r'<link href="[^"]*" rel="canonical"/>', canon_tag)
 
     # --- Dynamic JSON-LD Schema Injection ---
-    new_content = re.sub(r'<script type="application/ld\+json">.*?</script>', '', new_content, flags=re.DOTALL)
+    # (JSON-LD in the rest of the page is dropped in finalize_page_rest)
+    head.remove(LD_JSON_PATTERN)
 
     if current_post:
         post_url = f"https://gemini-vip.top/blog/{current_post['url']}"
@@ -1102,173 +1614,444 @@ def process_file(filepath, template_content, all_posts):
         
         schema_script = f'<script type="application/ld+json">\n{json.dumps(schema_json, indent=2, ensure_ascii=False)}\n</script>'
         
-        if '</head>' in new_content:
-            new_content = new_content.replace('</head>', f'{schema_script}\n</head>')
+        head.append(f'{schema_script}\n')
 
-    # --- Final Variable Replacement (Fix for {{ title }} bug) ---
-    var_title = ''
-    var_desc = ''
-    var_kw = ''
-    var_canon = ''
-    
-    if current_post:
-        var_title = current_post['title']
-        var_desc = current_post['summary']
-        if current_post['tags']:
-            var_kw = ', '.join(current_post['tags'])
-        var_canon = f"https://gemini-vip.top/blog/{current_post['url']}"
-    else:
-        # Fallback for pages not in all_posts (like index.html)
-        if src_title:
-            var_title = src_title.group(1).split(' - ')[0]
-        if src_desc:
-            var_desc = src_desc.group(1)
-        if src_kw:
-            # Extract content from src_kw tag
-            m = re.search(r'content="([^"]*)"', src_kw.group(0))
-            if m: var_kw = m.group(1)
-        if src_canon:
-            m = re.search(r'href="([^"]*)"', src_canon.group(0))
-            if m: var_canon = m.group(1)
+    page = page_start + head.serialize() + finalize_page_rest(page_rest)
+    profile_mark('meta')
+    return page
 
-    if var_title:
-        new_content = new_content.replace('{{ title }}', var_title)
-    if var_desc:
-        new_content = new_content.replace('{{ description }}', var_desc)
-    if var_kw:
-        new_content = new_content.replace('{{ keywords }}', var_kw)
-    else:
-         # Clean up empty placeholder if no keywords
-        new_content = new_content.replace('{{ keywords }}', '')
-        
-    if var_canon:
-        # Ensure canonical is full URL or absolute path
-        if not var_canon.startswith('http'):
-             if not var_canon.startswith('/'):
-                 var_canon = '/' + var_canon
-             var_canon = f"https://gemini-vip.top{var_canon}"
-        new_content = new_content.replace('{{ canonical }}', var_canon)
-    else:
-         # Fallback to current URL if no canonical provided
-         if current_post:
-             new_content = new_content.replace('{{ canonical }}', f"https://gemini-vip.top/blog/{current_post['url']}")
-         else:
-             new_content = new_content.replace('{{ canonical }}', '')
+# --- Parallel Rendering (Phase 2) ---
+# Workers get the template once through the pool initializer; each job only
+# carries the page source, its metadata and its precomputed related posts.
+_RENDER_TEMPLATE = None
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(new_content)
-    print(f"Processed {filepath} - Written successfully")
+def _init_render_worker(template, html_parser):
+    global _RENDER_TEMPLATE
+    _RENDER_TEMPLATE = template
+    set_html_parser(html_parser)
 
-def scan_and_build_homepage(all_posts):
-    print("Building Homepage from Post Metadata...")
-    index_file = os.path.join(BLOG_DIR, 'index.html')
-    
-    if not os.path.exists(index_file):
-        print("Missing index.html")
-        return
+def _render_post_job(job):
+    filepath, content, current_post, related_posts = job
+    return render_post(filepath, content, _RENDER_TEMPLATE, current_post, related_posts)
 
-    sorted_posts = sorted(all_posts, key=lambda x: (x.get('card_sticky', 0), x.get('date', '1970-01-01')), reverse=True)
+def render_posts(jobs, template, workers):
+    """
+    Renders [(filepath, content, current_post, related_posts), ...] and returns
+    the pages in the same order. Uses a process pool when workers > 1; the
+    output is identical to a serial run because render_post is pure.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        return [render_post(job[0], job[1], template, job[2], job[3]) for job in jobs]
     
-    grid_html = ''
-    for post in sorted_posts:
-        url = post['url']
-        title = post['title']
-        summary = post.get('summary', '')
-        if not summary:
-             summary = f"阅读关于 {title} 的详细内容。"
-             
-        category = post.get('card_category', '教程')
-        cat_icon = 'fa-book'
-        if '评测' in category: cat_icon = 'fa-chart-simple'
-        elif '指南' in category: cat_icon = 'fa-compass'
-        elif '优惠' in category or '羊毛' in category: cat_icon = 'fa-gift'
-        elif '故障' in category: cat_icon = 'fa-wrench'
-        
-        icon = post.get('card_icon', 'fa-star')
-        color = post.get('card_color', 'purple')
-        read_time = post.get('read_time', '3分钟阅读')
-        
-        secondary_color = GRADIENT_MAP.get(color, 'purple')
-        rgba = SHADOW_MAP.get(color, '168,85,247')
-        
-        card_html = f'''
-        <article class="h-full" data-category="{category}">
-          <a class="group block h-full" href="/blog/{url}">
-            <div class="bg-slate-900/50 border border-white/10 rounded-2xl overflow-hidden h-full hover:border-{color}-500/50 hover:shadow-[0_0_30px_rgba({rgba},0.15)] transition-all duration-300 flex flex-col">
-              <div class="h-48 bg-slate-800 relative overflow-hidden">
-                <div class="absolute inset-0 bg-gradient-to-br from-{color}-600/20 via-slate-900/50 to-{secondary_color}-600/20 group-hover:scale-105 transition duration-700"></div>
-                <div class="absolute inset-0 flex items-center justify-center opacity-30 group-hover:opacity-50 transition">
-                  <i class="fa-solid {icon} text-6xl text-{color}-400"></i>
-                </div>
-                <div class="absolute bottom-4 left-4 bg-black/60 backdrop-blur-md px-3 py-1 rounded-full text-[10px] text-white font-bold border border-white/10">
-                  <i class="fa-solid {cat_icon} mr-1 text-{color}-400"></i> {category}
-                </div>
-              </div>
-              <div class="p-6 flex-1 flex flex-col">
-                <h3 class="text-xl font-bold text-white mb-3 group-hover:text-{color}-400 transition leading-snug">
-                  {title}
-                </h3>
-                <p class="text-slate-400 text-sm line-clamp-3 mb-4 flex-1 leading-relaxed">
-                  {summary}
-                </p>
-                <div class="text-slate-500 text-xs mt-auto pt-4 border-t border-white/5 flex items-center justify-between">
-                  <span><i class="fa-regular fa-clock mr-1"></i> {read_time}</span>
-                  <span class="text-{color}-400 group-hover:translate-x-1 transition">阅读全文 →</span>
-                </div>
-              </div>
-            </div>
-          </a>
-        </article>'''
-        grid_html += card_html
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                             initargs=(template, HTML_PARSER)) as pool:
+        return list(pool.map(_render_post_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
 
-    with open(index_file, 'r', encoding='utf-8') as f:
-        content = f.read()
+# Posts rendered (and held in memory) at a time
+RENDER_BATCH = 1000
 
-    # --- Update Last Updated Date ---
-    # Find the latest date from all posts
-    all_dates = [p.get('date', '1970-01-01') for p in all_posts]
-    if all_dates:
-        latest_date = max(all_dates)
-        print(f"Updating Homepage Last Updated Date to: {latest_date}")
+def build_posts(all_posts, documents, related_map, template, config_hash, manifest, workers):
+    """
+    Phase 2 of the build: renders every post whose inputs changed since the
+    manifest was written, writes it to DIST_DIR, drops outputs of deleted
+    posts and saves the manifest. Returns the filepaths that were rendered.
+    """
+    built_pages = {}
+    skipped = 0
+    jobs = []
+    jobs_inputs = []
+    for current_post in all_posts:
+        filepath = current_post['filepath']
+        related_posts = related_map[current_post['url']]
+        inputs_hash = get_page_inputs_hash(config_hash, documents[filepath], current_post, related_posts)
         
-        # Regex to replace the timestamp
-        # Matches: <div class="mt-2 text-xs text-slate-500">最后更新：<time datetime="...">...</time></div>
-        date_pattern = r'<div class="mt-2 text-xs text-slate-500">\s*最后更新：\s*<time datetime="[^"]*">[^<]*</time>\s*</div>'
-        new_date_html = f'<div class="mt-2 text-xs text-slate-500">最后更新：<time datetime="{latest_date}">{latest_date}</time></div>'
+        if not should_rebuild_page(manifest, filepath, inputs_hash):
+            built_pages[filepath] = manifest['pages'][filepath]
+            skipped += 1
+            continue
         
-        if re.search(date_pattern, content):
-            content = re.sub(date_pattern, new_date_html, content)
-        else:
-            print("Warning: Could not find 'Last Updated' div in blog/index.html to update.")
-    # --------------------------------
+        jobs.append((filepath, documents[filepath], current_post, related_posts))
+        jobs_inputs.append(inputs_hash)
     
-    if '{{ featured_grid }}' in content:
-        new_content = content.replace('{{ featured_grid }}', grid_html)
-    else:
-        soup = BeautifulSoup(content, 'html.parser')
-        grid_div = soup.find('div', class_='grid grid-cols-1 md:grid-cols-3 gap-8')
-        if grid_div:
-            grid_div.clear()
-            if grid_html.strip():
-                # Use html.parser to parse the fragment
-                # Wrap in a dummy div to ensure proper parsing of multiple siblings
-                grid_soup = BeautifulSoup(f'<div>{grid_html}</div>', 'html.parser')
-                # Move children from dummy div to grid_div
-                # Use list() to create a copy of children to avoid iteration issues during modification
-                for child in list(grid_soup.div.contents):
-                    grid_div.append(child)
-            else:
-                print("Warning: grid_html is empty!")
+    # Render across all cores, write from the main process; in batches, so a
+    # large site never holds all its rendered pages at once
+    print(f"Rendering {len(jobs)} posts with {min(workers, max(1, len(jobs)))} worker(s)...")
+    written = []
+    for start in range(0, len(jobs), RENDER_BATCH):
+        batch = jobs[start:start + RENDER_BATCH]
+        with profile_phase('render_posts'):
+            rendered = render_posts(batch, template, workers)
+        for job, inputs_hash, new_content in zip(batch, jobs_inputs[start:start + RENDER_BATCH], rendered):
+            filepath = job[0]
+            if new_content is None:
+                continue
+            # Icons, critical CSS, minification and asset URLs
+            with profile_stage(filepath, 'publish'):
+                page = publish_page(new_content, get_output_path(filepath))
+            with profile_stage(filepath, 'write'):
+                write_file_atomic(get_output_path(filepath), page)
+            record_built_page(manifest, filepath, page, inputs_hash)
+            built_pages[filepath] = manifest['pages'][filepath]
+            written.append(filepath)
+            print(f"Processed {filepath} - Written successfully")
+    
+    # Drop entries (and outputs) of deleted posts
+    for filepath in manifest['pages']:
+        if filepath not in built_pages and remove_file(get_output_path(filepath)):
+            print(f"Removed {get_output_path(filepath)} (source deleted)")
+    manifest['pages'] = built_pages
+    save_build_manifest(manifest)
+    print(f"Posts rendered: {len(built_pages) - skipped}, unchanged and skipped: {skipped}")
+    return written
+
+# --- Watch Mode (--watch) ---
+# Polls the mtimes of everything the build reads. Changed posts are re-read
+# into the in-memory document store; the manifest then re-renders only them
+# and the pages embedding their cards. The index pages and the sitemap are
+# rebuilt only when the metadata they list changed. A change to the build
+# scripts restarts the process (POST_CONFIG, templates in code...).
+# Pages are published as they are written, so the site-wide steps only run
+# when their inputs changed: the stylesheet, the font subset and the asset
+# fingerprints (then a republish of every page) after a change to anything but
+# a post, the stylesheet also when a page uses a class it has not seen or the
+# posts' shared scaffold (critical CSS chrome) changed; only the outputs whose
+# mtime changed are recompressed.
+WATCH_INTERVAL = 0.3
+CLASS_ATTR_PATTERN = re.compile(r'\sclass="([^"]*)"')
+WATCH_CODE_FILES = ['build.py', 'build_io.py', 'update_sitemap.py', 'search_index.py', 'stylesheet.py',
+                    'fingerprint.py', 'publish.py', 'minify.py', 'compress.py',
+                    'icons.py', 'critical_css.py', 'fonts.py', 'changed_urls.py', 'packages.py']
+
+def snapshot_sources():
+    """{path: (mtime_ns, size)} of every file the build reads."""
+    paths = [TEMPLATE_FILE, ROOT_INDEX_FILE, update_sitemap.SITEMAP_HTML] + WATCH_CODE_FILES + STATIC_FILES
+    if os.path.isdir(BLOG_DIR):
+        paths += [os.path.join(BLOG_DIR, f) for f in os.listdir(BLOG_DIR) if f.endswith('.html')]
+    for directory in STATIC_DIRS:
+        for root, dirs, files in os.walk(directory):
+            paths += [os.path.join(root, f) for f in files]
+    snapshot = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        snapshot[path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+def snapshot_outputs():
+    """{path: (mtime_ns, size)} of everything in DIST_DIR."""
+    snapshot = {}
+    for root, dirs, files in os.walk(DIST_DIR):
+        for filename in files:
+            path = os.path.join(root, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+def get_changed_paths(old, new):
+    return {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+
+def get_page_classes(paths):
+    """Class names used by the published pages among paths."""
+    classes = set()
+    for path in paths:
+        if not path.endswith('.html'):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            continue
+        for value in CLASS_ATTR_PATTERN.findall(content):
+            classes.update(value.split())
+    return classes
+
+def is_post_source(path):
+    return os.path.dirname(path) == BLOG_DIR and path.endswith('.html') and os.path.basename(path) != 'index.html'
+
+def get_listing_key(all_posts):
+    # Everything the blog index and the root index read from the posts
+    return hash_text(json.dumps(all_posts, sort_keys=True, ensure_ascii=False))
+
+def get_sitemap_key(sitemap_entries):
+    return hash_text(json.dumps(sorted(sitemap_entries.values(), key=lambda e: e['url']), ensure_ascii=False))
+
+def watch_site(args, template_content, template, documents, all_posts, manifest):
+    """Rebuilds what a source change affects, until interrupted (Ctrl+C)."""
+    metadata = {post['filepath']: post for post in all_posts}
+    sitemap_entries = {fp: update_sitemap.get_post_entry(fp, c) for fp, c in documents.items()}
+    listing_key = get_listing_key(all_posts)
+    sitemap_key = get_sitemap_key(sitemap_entries)
+    snapshot = snapshot_sources()
+    outputs = snapshot_outputs()
+    known_classes = get_page_classes(outputs)
+    print(f"Watching {BLOG_DIR}/, {TEMPLATE_FILE} and the build scripts for changes (Ctrl+C to stop)...")
+    
+    try:
+        while True:
+            time.sleep(args.interval)
+            current = snapshot_sources()
+            changed = get_changed_paths(snapshot, current)
+            if not changed:
+                continue
+            snapshot = current
+            start = time.perf_counter()
+            print(f"\nChanged: {', '.join(sorted(changed))}")
+            
+            if changed & set(WATCH_CODE_FILES):
+                print("Build scripts changed, restarting...")
+                os.execv(sys.executable, [sys.executable] + sys.argv)
+            
+            if TEMPLATE_FILE in changed:
+                try:
+                    template_content = get_template()
+                    template = compile_template(template_content)
+                except (OSError, TemplateError) as e:
+                    print(f"Template error, keeping the previous template:\n{e}")
+            
+            for path in sorted(p for p in changed if is_post_source(p)):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        documents[path] = f.read()
+                except FileNotFoundError:
+                    documents.pop(path, None)
+                    metadata.pop(path, None)
+                    sitemap_entries.pop(path, None)
+                    continue
+                metadata[path] = get_post_metadata(path, documents[path])
+                sitemap_entries[path] = update_sitemap.get_post_entry(path, documents[path])
+            documents = dict(sorted(documents.items()))
+            all_posts = [metadata[filepath] for filepath in documents]
+            chrome_changed = (any(is_post_source(path) for path in changed)
+                              and critical_css.set_extra_chrome(get_critical_chrome(documents)))
+            
+            try:
+                related_map = assign_related_posts(all_posts)
+                config_hash = get_config_hash(template_content)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    updated = build_posts(all_posts, documents, related_map, template, config_hash, manifest, args.jobs)
+                
+                new_listing_key = get_listing_key(all_posts)
+                listing_changed = new_listing_key != listing_key
+                if listing_changed or os.path.join(BLOG_DIR, 'index.html') in changed:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        scan_and_build_homepage(all_posts)
+                        archives = build_archives(all_posts, manifest, config_hash)
+                    updated.append(os.path.join(BLOG_DIR, 'index.html'))
+                    updated.extend(archives)
+                if listing_changed or ROOT_INDEX_FILE in changed:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        update_root_homepage(all_posts)
+                    updated.append(ROOT_INDEX_FILE)
+                
+                new_sitemap_key = get_sitemap_key(sitemap_entries)
+                if new_sitemap_key != sitemap_key or update_sitemap.SITEMAP_HTML in changed:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        update_indices(documents)
+                    updated.append('sitemap')
+                
+                if any(is_post_source(path) for path in changed):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        search_index.build_search_index(documents, all_posts)
+                    updated.append('search index')
+                
+                static_changed = any(path in STATIC_FILES or path.startswith(tuple(d + os.sep for d in STATIC_DIRS))
+                                     for path in changed)
+                if static_changed:
+                    copy_static_files()
+                
+                current_outputs = snapshot_outputs()
+                written = get_changed_paths(outputs, current_outputs)
+                new_classes = get_page_classes(path for path in written if path in current_outputs)
+                templates_changed = any(not is_post_source(path) for path in changed)
+                if templates_changed or chrome_changed or not new_classes <= known_classes:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        stylesheet.build_stylesheet()
+                        if templates_changed:
+                            fonts.build_font(manifest.setdefault('font', {}))
+                        fingerprint.fingerprint_assets()
+                        refresh_built_pages(manifest, publish.republish_pages())
+                        manifest['published'] = publish.get_publish_key()
+                    known_classes |= new_classes
+                    updated.append('stylesheet')
+                    current_outputs = snapshot_outputs()
+                    written = get_changed_paths(outputs, current_outputs)
+                if written:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        compress.compress_outputs(manifest.setdefault('compressed', {}), args.jobs, written)
+                        save_build_manifest(manifest)
+                outputs = snapshot_outputs()
+                listing_key, sitemap_key = new_listing_key, new_sitemap_key
+            except Exception as e:
+                # Keep watching: the next save usually fixes it
+                print(f"Rebuild failed: {e!r}")
+                continue
             
-            new_content = str(soup)
+            print(f"Rebuilt {len(updated)} page(s) in {time.perf_counter() - start:.2f}s: {', '.join(updated) or 'nothing changed'}")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    return 0
+
+# --- Marker Regions (index pages) ---
+# The generated parts of hand-edited pages sit between
+#   <!-- build:NAME --> ... <!-- /build:NAME -->
+# and are replaced as plain string ranges. The rest of the page is copied
+# through as-is: it is never parsed or re-serialized.
+REGION_PATTERN = re.compile(r'<!-- build:([\w-]+) -->(.*?)<!-- /build:\1 -->', re.DOTALL)
+GRID_CLASS = 'grid grid-cols-1 md:grid-cols-3 gap-8'
+
+def splice_regions(content, regions):
+    """
+    Replaces the body of each marker region named in regions ({name: html})
+    in one pass. Returns (new content, names of regions that were not found).
+    """
+    parts = []
+    pos = 0
+    found = set()
+    for m in REGION_PATTERN.finditer(content):
+        name = m.group(1)
+        if name not in regions:
+            continue
+        parts.append(content[pos:m.start(2)])
+        parts.append(regions[name])
+        pos = m.end(2)
+        found.add(name)
+    parts.append(content[pos:])
+    return ''.join(parts), set(regions) - found
+
+def replace_grid_with_soup(content, grid_html, section_id=None):
+    """
+    Fallback for pages without region markers: swaps the contents of the
+    card grid through BeautifulSoup (re-serializes the whole page).
+    Returns None if the grid is not found.
+    """
+    soup = parse_html(content)
+    scope = soup.find('section', id=section_id) if section_id else soup
+    grid_div = scope.find('div', class_=GRID_CLASS) if scope else None
+    if not grid_div:
+        return None
+    grid_div.clear()
+    if grid_html.strip():
+        # Wrap in a dummy div to ensure proper parsing of multiple siblings
+        grid_soup = parse_fragment(f'<div>{grid_html}</div>')
+        # list() copies the children, append() moves them out of grid_soup
+        for child in list(grid_soup.div.contents):
+            grid_div.append(child)
+    else:
+        print("Warning: grid_html is empty!")
+    return str(soup)
+
+def splice_grid(content, region, grid_html, page, section_id=None):
+    """Puts grid_html into the <!-- build:region --> markers of page (or the soup fallback)."""
+    new_content, missing = splice_regions(content, {region: f'{grid_html}\n'})
+    if not missing:
+        return new_content
+    print(f"Warning: no <!-- build:{region} --> markers in {page}, falling back to BeautifulSoup.")
+    return replace_grid_with_soup(content, grid_html, section_id)
+
+def render_blog_card(post):
+    """One post card of the blog index grid."""
+    url = post['url']
+    title = post['title']
+    summary = post.get('summary', '')
+    if not summary:
+         summary = f"阅读关于 {title} 的详细内容。"
+         
+    category = post.get('card_category', '教程')
+    cat_icon = 'fa-book'
+    if '评测' in category: cat_icon = 'fa-chart-simple'
+    elif '指南' in category: cat_icon = 'fa-compass'
+    elif '优惠' in category or '羊毛' in category: cat_icon = 'fa-gift'
+    elif '故障' in category: cat_icon = 'fa-wrench'
+    
+    icon = post.get('card_icon', 'fa-star')
+    color = post.get('card_color', 'purple')
+    read_time = post.get('read_time', '3分钟阅读')
+    
+    secondary_color = GRADIENT_MAP.get(color, 'purple')
+    rgba = SHADOW_MAP.get(color, '168,85,247')
+    
+    return f'''
+    <article class="h-full" data-category="{category}">
+      <a class="group block h-full" href="/blog/{url}">
+        <div class="bg-slate-900/50 border border-white/10 rounded-2xl overflow-hidden h-full hover:border-{color}-500/50 hover:shadow-[0_0_30px_rgba({rgba},0.15)] transition-all duration-300 flex flex-col">
+          <div class="h-48 bg-slate-800 relative overflow-hidden">
+            <div class="absolute inset-0 bg-gradient-to-br from-{color}-600/20 via-slate-900/50 to-{secondary_color}-600/20 group-hover:scale-105 transition duration-700"></div>
+            <div class="absolute inset-0 flex items-center justify-center opacity-30 group-hover:opacity-50 transition">
+              <i class="fa-solid {icon} text-6xl text-{color}-400"></i>
+            </div>
+            <div class="absolute bottom-4 left-4 bg-black/60 backdrop-blur-md px-3 py-1 rounded-full text-[10px] text-white font-bold border border-white/10">
+              <i class="fa-solid {cat_icon} mr-1 text-{color}-400"></i> {category}
+            </div>
+          </div>
+          <div class="p-6 flex-1 flex flex-col">
+            <h3 class="text-xl font-bold text-white mb-3 group-hover:text-{color}-400 transition leading-snug">
+              {title}
+            </h3>
+            <p class="text-slate-400 text-sm line-clamp-3 mb-4 flex-1 leading-relaxed">
+              {summary}
+            </p>
+            <div class="text-slate-500 text-xs mt-auto pt-4 border-t border-white/5 flex items-center justify-between">
+              <span><i class="fa-regular fa-clock mr-1"></i> {read_time}</span>
+              <span class="text-{color}-400 group-hover:translate-x-1 transition">阅读全文 →</span>
+            </div>
+          </div>
+        </div>
+      </a>
+    </article>'''
+
+# --- Paginated Listings (blog index and archives) ---
+# /blog/ shows the first BLOG_PAGE_SIZE posts, /blog/page/N the following ones
+# (dist/blog/page/N.html, served without .html like the posts). Category and
+# tag archives are paginated the same way under /blog/category/<slug> and
+# /blog/tag/<slug>. Every listing page is blog/index.html with its marker
+# regions filled in, and only carries its own cards and its own
+# CollectionPage ItemList, so page weight stays constant as the archive grows.
+BLOG_PAGE_SIZE = 12
+BLOG_URL = '/blog/'
+# Tags need this many posts to get an archive page (no one-post hubs)
+TAG_ARCHIVE_MIN_POSTS = 2
+ARCHIVE_KINDS = {'category': '分类', 'tag': '标签'}
+
+def get_listing_page_url(base_url, number):
+    return base_url if number == 1 else f"{base_url.rstrip('/')}/page/{number}"
+
+def get_listing_page_output(base_url, number):
+    url = get_listing_page_url(base_url, number)
+    path = url.strip('/')
+    return dist_path(path, 'index.html') if url.endswith('/') else dist_path(path + '.html')
+
+def get_full_url(url):
+    # Archive slugs may be CJK: percent-encode them in links
+    return f"https://gemini-vip.top{quote(url)}"
+
+def render_pagination(base_url, number, total):
+    """Server-side pager (an empty, hidden nav when everything fits on one page)."""
+    if total <= 1:
+        return '<nav aria-label="分页" class="hidden" id="blog-pagination"></nav>\n'
+    link = 'px-3 py-1 rounded-lg bg-white/10 text-slate-300 text-xs font-bold hover:bg-white/20 transition border border-white/10'
+    current = 'px-3 py-1 rounded-lg bg-purple-600 text-white text-xs font-bold border border-purple-500'
+    items = []
+    if number > 1:
+        items.append(f'<a class="{link}" href="{quote(get_listing_page_url(base_url, number - 1))}" rel="prev">上一页</a>')
+    for n in range(1, total + 1):
+        if n == number:
+            items.append(f'<span aria-current="page" class="{current}">{n}</span>')
         else:
-            print("Could not find grid container in index.html to update.")
-            return
-
-    # --- Update JSON-LD CollectionPage ---
-    print("Updating JSON-LD CollectionPage...")
+            items.append(f'<a class="{link}" href="{quote(get_listing_page_url(base_url, n))}">{n}</a>')
+    if number < total:
+        items.append(f'<a class="{link}" href="{quote(get_listing_page_url(base_url, number + 1))}" rel="next">下一页</a>')
+    return ('<nav aria-label="分页" class="mt-12 flex flex-wrap items-center justify-center gap-2" id="blog-pagination">\n'
+            + '\n'.join(items) + '\n</nav>\n')
+
+def get_collection_page_json(page_posts, offset, page_url, name="Gemini 教程与评测合集",
+                             description="Google Gemini 相关教程、评测、指南聚合页"):
     json_items = []
-    for i, post in enumerate(sorted_posts, 1):
+    for i, post in enumerate(page_posts, offset + 1):
         full_url = f"https://gemini-vip.top/blog/{post['url']}"
         post_desc = post.get('summary', '')
         if not post_desc:
@@ -1294,12 +2077,12 @@ def scan_and_build_homepage(all_posts):
         }
         json_items.append(item)
     
-    collection_page_json = {
+    return {
         "@context": "https://schema.org",
         "@type": "CollectionPage",
-        "name": "Gemini 教程与评测合集",
-        "description": "Google Gemini 相关教程、评测、指南聚合页",
-        "url": "https://gemini-vip.top/blog/",
+        "name": name,
+        "description": description,
+        "url": get_full_url(page_url),
         "mainEntity": {
             "@type": "ItemList",
             "itemListElement": json_items
@@ -1316,36 +2099,287 @@ def scan_and_build_homepage(all_posts):
         }
     }
 
-    new_script_block = f'<script type="application/ld+json">\n{json.dumps(collection_page_json, ensure_ascii=False, indent=2)}\n</script>'
+COLLECTION_PAGE_PATTERN = r'<script type="application/ld\+json">\s*\{[\s\S]*?"@type":\s*"CollectionPage"[\s\S]*?\}\s*</script>'
+LAST_UPDATED_PATTERN = re.compile(r'<div class="mt-2 text-xs text-slate-500">\s*最后更新：\s*<time datetime="[^"]*">[^<]*</time>\s*</div>')
+
+def set_last_updated(content, posts, page):
+    # Matches: <div class="mt-2 text-xs text-slate-500">最后更新：<time datetime="...">...</time></div>
+    if not posts:
+        return content
+    latest_date = max(p.get('date', '1970-01-01') for p in posts)
+    new_date_html = f'<div class="mt-2 text-xs text-slate-500">最后更新：<time datetime="{latest_date}">{latest_date}</time></div>'
+    new_content, count = LAST_UPDATED_PATTERN.subn(new_date_html, content)
+    if not count:
+        print(f"Warning: Could not find 'Last Updated' div in {page} to update.")
+    return new_content
+
+def render_listing_page(content, page_posts, offset, number, total, archive=None, archive_links='',
+                        category_filter=''):
+    """
+    One page of the blog index (archive=None) or of a category/tag archive,
+    from the blog/index.html source.
+    """
+    base_url = archive['url'] if archive else BLOG_URL
+    page_url = get_listing_page_url(base_url, number)
+    full_url = get_full_url(page_url)
+    grid_html = ''.join(render_blog_card(post) for post in page_posts)
+    regions = {
+        'post-grid': f'{grid_html}\n',
+        'pagination': render_pagination(base_url, number, total),
+        'archive-links': archive_links,
+        'category-filter': category_filter,
+    }
+    if archive:
+        label = f"{ARCHIVE_KINDS[archive['kind']]}：{archive['name']}"
+        regions['breadcrumb-current'] = f'<li aria-current="page" class="text-white font-medium">{label}</li>'
+        regions['page-heading'] = f'<h1 class="text-3xl md:text-5xl font-black text-white mb-3 leading-tight">{label}</h1>'
+    new_content, missing = splice_regions(content, regions)
+    if 'post-grid' in missing:
+        if archive:
+            print("Error: archive pages need the <!-- build:post-grid --> markers in blog/index.html.")
+            return None
+        print("Warning: no <!-- build:post-grid --> markers in blog/index.html, falling back to BeautifulSoup.")
+        new_content = replace_grid_with_soup(content, grid_html)
+        if new_content is None:
+            return None
+    for name in sorted(missing - {'post-grid'}):
+        print(f"Warning: no <!-- build:{name} --> markers in blog/index.html.")
     
-    # Robust replacement of the entire CollectionPage script block
-    # Matches <script ...> ... "@type": "CollectionPage" ... </script>
-    pattern = r'<script type="application/ld\+json">\s*\{[\s\S]*?"@type":\s*"CollectionPage"[\s\S]*?\}\s*</script>'
+    page_start, head, page_rest = split_page_head(new_content)
     
-    if re.search(pattern, new_content):
-        new_content = re.sub(pattern, lambda m: new_script_block, new_content, count=1)
-        print("Updated existing CollectionPage JSON-LD.")
+    # --- CollectionPage JSON-LD (this page's posts only) ---
+    if archive:
+        collection_page_json = get_collection_page_json(
+            page_posts, offset, page_url, name=f"{label} - Gemini 教程与评测合集",
+            description=f"{label}下的 {len(archive['posts'])} 篇 Gemini 教程与评测文章")
+    else:
+        collection_page_json = get_collection_page_json(page_posts, offset, page_url)
+    new_script_block = f'<script type="application/ld+json">\n{json.dumps(collection_page_json, ensure_ascii=False, indent=2)}\n</script>'
+    if head.find(COLLECTION_PAGE_PATTERN):
+        head.replace(COLLECTION_PAGE_PATTERN, new_script_block)
     else:
         print("Warning: CollectionPage JSON-LD block not found. Inserting new one.")
-        if '</head>' in new_content:
-             new_content = new_content.replace('</head>', f'{new_script_block}\n</head>')
-    
-    # --- Update Hreflang for Blog Index ---
-    print("Updating Hreflang for Blog Index...")
-    new_content = re.sub(
-        r'<link href="[^"]*" hreflang="zh-CN" rel="alternate"/>', 
-        '<link href="https://gemini-vip.top/blog/" hreflang="zh-CN" rel="alternate"/>', 
-        new_content
-    )
-    # --------------------------------------
+        head.append(f'{new_script_block}\n')
+    
+    # --- Hreflang / canonical / title / pagination links ---
+    head.replace(r'<link href="[^"]*" hreflang="zh-CN" rel="alternate"/>',
+                 f'<link href="{full_url}" hreflang="zh-CN" rel="alternate"/>')
+    if archive or number > 1:
+        head.replace(r'<link href="[^"]*" rel="canonical"/>', f'<link href="{full_url}" rel="canonical"/>')
+        head.replace(r'<meta content="[^"]*" property="og:url"/>', f'<meta content="{full_url}" property="og:url"/>')
+        title = head.find(r'<title>(.*?)</title>')
+        if title:
+            name, sep, brand = title.group(1).rpartition('_')
+            if archive:
+                name = f"{label}_Gemini 教程与评测合集"
+            if number > 1:
+                name = f"{name}_第{number}页"
+            page_title = f'{name}{sep}{brand}' if sep else f'{brand} - {name}'
+            head.replace(r'<title>.*?</title>', f'<title>{page_title}</title>')
+    if archive:
+        description = f"{label}。共 {len(archive['posts'])} 篇 Gemini 相关教程、评测与指南文章。"
+        head.replace(r'<meta content="[^"]*" name="description"/>', f'<meta content="{description}" name="description"/>')
+    if number > 1:
+        head.append(f'<link href="{get_full_url(get_listing_page_url(base_url, number - 1))}" rel="prev"/>\n')
+    if number < total:
+        head.append(f'<link href="{get_full_url(get_listing_page_url(base_url, number + 1))}" rel="next"/>\n')
+    
+    return page_start + head.serialize() + page_rest
+
+def build_listing(content, posts, archive=None, archive_links='', category_filter='', write=True):
+    """
+    Renders every page of a listing (posts already sorted) and writes them.
+    Returns the rendered pages, or None on failure.
+    """
+    base_url = archive['url'] if archive else BLOG_URL
+    total = max(1, -(-len(posts) // BLOG_PAGE_SIZE))
+    pages = []
+    for number in range(1, total + 1):
+        offset = (number - 1) * BLOG_PAGE_SIZE
+        page = render_listing_page(content, posts[offset:offset + BLOG_PAGE_SIZE], offset, number, total,
+                                   archive, archive_links, category_filter)
+        if page is None:
+            return None
+        pages.append(page)
+        if write:
+            output = get_listing_page_output(base_url, number)
+            write_file_atomic(output, publish_page(page, output))
+    
+    # Pages left over from a longer listing
+    page_dir = os.path.dirname(get_listing_page_output(base_url, 2))
+    if write and os.path.isdir(page_dir):
+        for filename in os.listdir(page_dir):
+            number = filename[:-5]
+            if filename.endswith('.html') and number.isdigit() and int(number) > total:
+                remove_file(os.path.join(page_dir, filename))
+    return pages
+
+def sort_listing(posts):
+    return sorted(posts, key=lambda x: (x.get('card_sticky', 0), x.get('date', '1970-01-01')), reverse=True)
+
+# --- Category / Tag Archives ---
+# An inverted index ({(kind, name): [posts]}) is built from the metadata every
+# build. The manifest remembers a hash of what each archive shows (its
+# members' card data and the page shell), so only archives whose membership
+# or cards changed are rendered again.
+
+def get_archive_slug(name):
+    slug = re.sub(r'[\s/\\?#%&"\'<>.]+', '-', name.strip()).strip('-').lower()
+    return slug or 'archive'
+
+def build_archive_index(all_posts):
+    """{(kind, name): archive} for every category and every tag with enough posts."""
+    members = {}
+    for post in all_posts:
+        members.setdefault(('category', post.get('card_category', '教程')), []).append(post)
+        for tag in dict.fromkeys(t for t in post['tags'] if t):
+            members.setdefault(('tag', tag), []).append(post)
+    
+    archives = {}
+    used_urls = set()
+    for (kind, name), posts in sorted(members.items()):
+        if kind == 'tag' and len(posts) < TAG_ARCHIVE_MIN_POSTS:
+            continue
+        url = f"/blog/{kind}/{get_archive_slug(name)}"
+        suffix = 2
+        while url in used_urls:
+            url = f"/blog/{kind}/{get_archive_slug(name)}-{suffix}"
+            suffix += 1
+        used_urls.add(url)
+        archives[(kind, name)] = {'kind': kind, 'name': name, 'url': url, 'posts': sort_listing(posts)}
+    return archives
+
+def render_archive_links(archives, current=None, tags=True):
+    """
+    Links to every category archive and the tag archives (the hubs' entry
+    points). Archive pages pass tags=False and link to the tag list of the
+    blog index instead: the nav is part of every archive's inputs hash, and
+    tag archives come and go with almost every new post.
+    """
+    if not archives:
+        return ''
+    link = 'px-3 py-1 text-xs rounded-full bg-white/5 text-slate-400 hover:bg-white/10 hover:text-white transition border border-white/10'
+    active = 'px-3 py-1 text-xs rounded-full bg-purple-600 text-white border border-purple-500'
+    groups = []
+    for kind, label in ARCHIVE_KINDS.items():
+        items = [a for a in archives.values() if a['kind'] == kind]
+        if not items:
+            continue
+        if kind == 'tag' and not tags:
+            links = f'<a class="{link}" href="{BLOG_URL}#archive-tags">全部标签 →</a>'
+        else:
+            # No post counts and a fixed order, so the nav only changes when an archive comes or goes
+            items.sort(key=lambda a: a['name'])
+            links = '\n'.join(
+                f'<a class="{active if a["url"] == current else link}" href="{quote(a["url"])}">{a["name"]}</a>'
+                for a in items)
+        groups.append(f'<div class="flex flex-wrap items-center justify-center gap-2" id="archive-{kind}s">\n'
+                      f'<span class="text-xs text-slate-500">{label}</span>\n{links}\n</div>')
+    return ('<nav aria-label="文章分类与标签" class="mt-16 pt-8 border-t border-white/5 space-y-4">\n'
+            + '\n'.join(groups) + '\n</nav>\n')
+
+CATEGORY_FILTER_CLASS = 'flex flex-wrap items-center justify-center gap-2 mb-8'
+CATEGORY_LINK_CLASS = 'px-3 py-1 text-xs font-bold rounded-full bg-white/10 text-slate-300 hover:bg-white/20 transition border border-white/10'
+CATEGORY_ACTIVE_CLASS = 'px-3 py-1 text-xs font-bold rounded-full bg-purple-600 text-white border border-purple-500'
+
+def render_category_filter(archives):
+    """
+    The category buttons above the blog index grid. The index is paginated on
+    the server, so they link to the category archives (every post of the
+    category) instead of filtering the cards of the current page.
+    """
+    categories = [a for a in archives.values() if a['kind'] == 'category']
+    if not categories:
+        return ''
+    categories.sort(key=lambda a: (-len(a['posts']), a['name']))
+    links = [f'<a class="{CATEGORY_ACTIVE_CLASS}" href="{BLOG_URL}">全部</a>']
+    links += [f'<a class="{CATEGORY_LINK_CLASS}" href="{quote(a["url"])}">{a["name"]}</a>' for a in categories]
+    return f'<div class="{CATEGORY_FILTER_CLASS}">\n' + '\n'.join(links) + '\n</div>\n'
+
+def get_archive_inputs_hash(shell_hash, archive, archive_links):
+    cards = [[p['url'], p['title'], p.get('summary', ''), p.get('date', ''), p.get('read_time', ''),
+              p.get('card_category', ''), p.get('card_icon', ''), p.get('card_color', '')] for p in archive['posts']]
+    return hash_text(shell_hash, archive['url'], archive['name'], archive_links, json.dumps(cards, ensure_ascii=False))
+
+def build_archives(all_posts, manifest, config_hash, archives=None):
+    """
+    Writes the category/tag archive pages whose inputs changed since the last
+    build and removes archives that no longer exist. Returns the urls rendered.
+    """
+    index_file = os.path.join(BLOG_DIR, 'index.html')
+    if not os.path.exists(index_file):
+        print("Missing index.html, skipping archives")
+        return []
+    with open(index_file, 'r', encoding='utf-8') as f:
+        shell = f.read()
+    shell_hash = hash_text(config_hash, shell)
+    
+    archives = archives if archives is not None else build_archive_index(all_posts)
+    previous = manifest.get('archives', {})
+    current = {}
+    rendered = []
+    for archive in archives.values():
+        links = render_archive_links(archives, current=archive['url'], tags=False)
+        inputs_hash = get_archive_inputs_hash(shell_hash, archive, links)
+        total = max(1, -(-len(archive['posts']) // BLOG_PAGE_SIZE))
+        entry = previous.get(archive['url'])
+        outputs_exist = all(os.path.exists(get_listing_page_output(archive['url'], n)) for n in range(1, total + 1))
+        if entry and entry.get('inputs') == inputs_hash and outputs_exist:
+            current[archive['url']] = entry
+            continue
+        content = set_last_updated(shell, archive['posts'], index_file)
+        if build_listing(content, archive['posts'], archive, links) is None:
+            continue
+        current[archive['url']] = {'inputs': inputs_hash, 'pages': total}
+        rendered.append(archive['url'])
+    
+    # Archives whose last post went away (or fell under TAG_ARCHIVE_MIN_POSTS)
+    for url, entry in previous.items():
+        if url in current:
+            continue
+        for number in range(1, entry.get('pages', 1) + 1):
+            remove_file(get_listing_page_output(url, number))
+        print(f"Removed archive {url}")
+    
+    manifest['archives'] = current
+    save_build_manifest(manifest)
+    print(f"Archives rendered: {len(rendered)}, unchanged and skipped: {len(current) - len(rendered)}")
+    return rendered
+
+def scan_and_build_homepage(all_posts, write=True):
+    """
+    Builds blog/index.html and the /blog/page/N pages into DIST_DIR.
+    Returns the first page (None on failure).
+    """
+    print("Building Homepage from Post Metadata...")
+    index_file = os.path.join(BLOG_DIR, 'index.html')
+    
+    if not os.path.exists(index_file):
+        print("Missing index.html")
+        return
 
-    with open(index_file, 'w', encoding='utf-8') as f:
-        f.write(new_content)
-    print("Homepage built successfully from Meta Tags.")
+    sorted_posts = sort_listing(all_posts)
 
-def update_root_homepage(all_posts):
+    with open(index_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    # --- Update Last Updated Date ---
+    content = set_last_updated(content, all_posts, index_file)
+    
+    archives = build_archive_index(all_posts)
+    pages = build_listing(content, sorted_posts, archive_links=render_archive_links(archives),
+                          category_filter=render_category_filter(archives), write=write)
+    if pages is None:
+        print("Could not find grid container in index.html to update.")
+        return
+    
+    print(f"Homepage built successfully from Meta Tags ({len(pages)} page(s) of {BLOG_PAGE_SIZE}).")
+    return pages[0]
+
+def update_root_homepage(all_posts, write=True):
+    """Builds the root index.html into DIST_DIR. Returns the page (None on failure)."""
     print("Updating Root Homepage (index.html)...")
-    root_index_file = 'index.html'
+    root_index_file = ROOT_INDEX_FILE
     
     if not os.path.exists(root_index_file):
         print("Missing root index.html")
@@ -1407,44 +2441,209 @@ def update_root_homepage(all_posts):
     with open(root_index_file, 'r', encoding='utf-8') as f:
         content = f.read()
     
-    soup = BeautifulSoup(content, 'html.parser')
-    
-    # Find the #blog section
-    blog_section = soup.find('section', id='blog')
-    if blog_section:
-        grid_div = blog_section.find('div', class_='grid grid-cols-1 md:grid-cols-3 gap-8')
-        if grid_div:
-            grid_div.clear()
-            if grid_html.strip():
-                # Use html.parser to parse the fragment
-                grid_soup = BeautifulSoup(f'<div>{grid_html}</div>', 'html.parser')
-                for child in list(grid_soup.div.contents):
-                    grid_div.append(child)
-            else:
-                print("Warning: root grid_html is empty!")
-            
-            new_content = str(soup)
-            # Fix soup prettify issues if any (BeautifulSoup might mess up some void tags or formatting, but usually okay for this)
-            # Just writing str(soup) is usually safer than prettify() for preserving scripts/styles
-            
-            with open(root_index_file, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            print("Root Homepage updated successfully.")
-        else:
-            print("Could not find grid container in root index.html")
-    else:
-        print("Could not find #blog section in root index.html")
+    # Latest posts grid inside the #blog section
+    new_content = splice_grid(content, 'latest-posts', grid_html, root_index_file, section_id='blog')
+    if new_content is None:
+        print("Could not find the #blog grid container in root index.html")
+        return
+    
+    if write:
+        write_file_atomic(dist_path(root_index_file), publish_page(new_content, dist_path(root_index_file)))
+    print("Root Homepage updated successfully.")
+    return new_content
+
 
 
+def render_site_in_memory(all_posts, related_map, documents, template):
+    # Everything the build generates from BeautifulSoup trees, without writing
+    pages = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for post in all_posts:
+            filepath = post['filepath']
+            pages[filepath] = render_post(filepath, documents[filepath], template, post, related_map[post['url']])
+        pages[os.path.join(BLOG_DIR, 'index.html')] = scan_and_build_homepage(all_posts, write=False)
+        pages[ROOT_INDEX_FILE] = update_root_homepage(all_posts, write=False)
+    return pages
 
-def main():
+def check_parser_equivalence(all_posts, related_map, documents, template):
+    """
+    Renders the site with html.parser and with the selected backend and
+    reports every page whose output differs. Pages that only differ in
+    whitespace between tags (lxml drops the blank line after <!DOCTYPE>)
+    are listed but accepted. Returns True if no page really differs.
+    """
+    selected = HTML_PARSER
+    if selected == 'html.parser':
+        print("Parser check: html.parser is the reference backend, nothing to compare.")
+        return True
+    
+    set_html_parser('html.parser')
+    reference = render_site_in_memory(all_posts, related_map, documents, template)
+    set_html_parser(selected)
+    candidate = render_site_in_memory(all_posts, related_map, documents, template)
+    
+    identical = whitespace_only = 0
+    differing = []
+    for path in reference:
+        old, new = reference[path] or '', candidate[path] or ''
+        if old == new:
+            identical += 1
+        elif old.split() == new.split():
+            whitespace_only += 1
+            print(f"~ {path}: whitespace-only difference")
+        else:
+            differing.append(path)
+            diff = difflib.unified_diff(old.splitlines(), new.splitlines(), 'html.parser', selected, lineterm='', n=0)
+            print(f"❌ {path} differs:")
+            for line in list(diff)[:12]:
+                print(f"    {line}")
+    print(f"Parser check ({selected} vs html.parser): {identical} identical, "
+          f"{whitespace_only} whitespace-only, {len(differing)} different")
+    return not differing
+
+def copy_static_files():
+    """Publishes the static (non-generated) parts of the site to DIST_DIR."""
+    copied = 0
+    for filepath in STATIC_FILES:
+        # Published by fingerprint_assets(), with the per-asset cache rules
+        if not os.path.exists(filepath) or filepath == fingerprint.HEADERS_FILE:
+            continue
+        if filepath.endswith(publish.PUBLISHED_EXTENSIONS):
+            with open(filepath, 'r', encoding='utf-8') as f:
+                copied += write_file_atomic(dist_path(filepath), publish_page(f.read(), dist_path(filepath)))
+        else:
+            copied += copy_file_atomic(filepath, dist_path(filepath))
+    for directory in STATIC_DIRS:
+        for root, dirs, files in os.walk(directory):
+            for filename in files:
+                if filename == '.DS_Store':
+                    continue
+                filepath = os.path.join(root, filename)
+                copied += copy_file_atomic(filepath, dist_path(filepath))
+    print(f"Static files copied to {DIST_DIR}: {copied}")
+
+def get_critical_chrome(documents):
+    """
+    Above-the-fold classes of the page types that their template source does
+    not show (critical_css.set_extra_chrome): the article scaffold of the post
+    sources (what at least half of them show above the fold; some older posts
+    use a different header) and the category filter of the listing pages.
+    """
+    counts = collections.Counter()
+    for content in documents.values():
+        counts.update(critical_css.get_fold_tokens(content) or ())
+    filter_classes = ' '.join((CATEGORY_FILTER_CLASS, CATEGORY_LINK_CLASS, CATEGORY_ACTIVE_CLASS))
+    return {
+        critical_css.POST_TEMPLATE: {token for token, count in counts.items() if count * 2 >= len(documents)},
+        critical_css.LISTING_TEMPLATE: {'.' + name for name in filter_classes.split()},
+    }
+
+def build_site(template_content, template, manifest, jobs):
+    """
+    The build, phase by phase: reads the posts, renders and publishes the
+    pages whose inputs changed, then the listings, the sitemap, the search
+    index and the site-wide assets, and compresses the outputs. main() and
+    bench_build.py both run it; the phases are timed through _PROFILER.
+    Returns (documents, all_posts) for watch mode.
+    """
+    # Post document store: every post source is read from disk exactly once per
+    # build. All phases (metadata, rendering, sitemap / posts.json) use this dict.
+    with profile_phase('read_documents'):
+        documents = update_sitemap.read_post_documents()
+    with profile_phase('metadata'):
+        all_posts = [get_post_metadata(filepath, content) for filepath, content in documents.items()]
+    
+    critical_css.use_cache(manifest.setdefault('critical', {}))
+    critical_css.set_extra_chrome(get_critical_chrome(documents))
+    config_hash = get_config_hash(template_content)
+    
+    # Phase 1: deterministic related-post assignment for every page (including
+    # the ones skipped below, so the link balancing matches a full build).
+    with profile_phase('related_posts'):
+        related_map = assign_related_posts(all_posts)
+    
+    # What the pages already in DIST_DIR and the ones written below are published with
+    publish_key = publish.get_publish_key()
+    build_posts(all_posts, documents, related_map, template, config_hash, manifest, jobs)
+    
+    with profile_phase('scan_and_build_homepage'):
+        scan_and_build_homepage(all_posts)
+    with profile_phase('build_archives'):
+        build_archives(all_posts, manifest, config_hash)
+    with profile_phase('update_root_homepage'):
+        update_root_homepage(all_posts)
+    
+    with profile_phase('copy_static_files'):
+        copy_static_files()
+    with profile_phase('update_sitemap'):
+        update_indices(documents)
+    with profile_phase('search_index'):
+        search_index.build_search_index(documents, all_posts)
+    with profile_phase('stylesheet'):
+        stylesheet.build_stylesheet()
+    with profile_phase('font'):
+        fonts.build_font(manifest.setdefault('font', {}))
+    with profile_phase('fingerprint_assets'):
+        fingerprint.fingerprint_assets()
+    with profile_phase('republish_pages'):
+        # Only when the stylesheet, the font, the assets (or the critical CSS)
+        # changed since then, or DIST_DIR holds pages of another publish state
+        if publish_key != manifest.get('published') or publish.get_publish_key() != publish_key:
+            refresh_built_pages(manifest, publish.republish_pages())
+        else:
+            print("Pages republished: 0 (stylesheet, font and assets unchanged)")
+        manifest['published'] = publish.get_publish_key()
+    publish.print_minify_report()
+    critical_css.print_critical_report()
+    with profile_phase('compress'):
+        compress.compress_outputs(manifest.setdefault('compressed', {}), jobs)
+        save_build_manifest(manifest)
+    return documents, all_posts
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Build the Gemini-VIP static site.')
+    parser.add_argument('--force', action='store_true',
+                        help=f'ignore {MANIFEST_FILE} and re-render every post')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of render processes (default: all cores, 1 = serial)')
+    parser.add_argument('--parser', choices=PARSER_CHOICES,
+                        help='BeautifulSoup backend (default: BUILD_HTML_PARSER or auto)')
+    parser.add_argument('--check-parser', action='store_true',
+                        help='render the site with html.parser and the selected backend, report differences and exit')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_FILE, metavar='FILE',
+                        help=f'time and trace allocations of every stage of every page (implies --force --jobs 1) '
+                             f'and write the results to FILE (default: {PROFILE_FILE})')
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N',
+                        help='number of slowest pages listed after a --profile build (default: 10)')
+    parser.add_argument('--watch', action='store_true',
+                        help='after the build, keep rebuilding the pages affected by each source change')
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL,
+                        help=f'--watch polling interval in seconds (default: {WATCH_INTERVAL})')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global _PROFILER
+    args = parse_args(argv)
+    if args.parser:
+        set_html_parser(args.parser)
+    if args.profile:
+        # Every page, rendered in this process, so all stages are measured
+        args.force = True
+        args.jobs = 1
+        _PROFILER = BuildProfiler()
     print("Starting Build Process...")
     if not os.path.exists(TEMPLATE_FILE):
         print("Template file not found!")
         return
     
     template_content = get_template()
-    print(f"Template loaded. Length: {len(template_content)}")
+    try:
+        template = compile_template(template_content)
+    except TemplateError as e:
+        print(f"Template error:\n{e}")
+        return 1
+    print(f"Template loaded. Length: {len(template_content)}, {len(template.slots)} slots")
+    print(f"HTML parser backend: {HTML_PARSER}")
     
     if not os.path.exists(BLOG_DIR):
         print(f"Directory {BLOG_DIR} not found!")
@@ -1453,21 +2652,29 @@ def main():
     # print("Extracting styles from index...")
     # style_db = extract_styles()
 
-    all_posts = []
-    for filename in os.listdir(BLOG_DIR):
-        if filename.endswith('.html') and filename != 'index.html':
-             filepath = os.path.join(BLOG_DIR, filename)
-             all_posts.append(get_post_metadata(filepath))
+    manifest = load_build_manifest()
+    if args.force:
+        # The record of compressed siblings is about files on disk, not rendering
+        manifest = {'version': MANIFEST_VERSION, 'pages': {}, 'compressed': manifest.get('compressed', {})}
+    
+    if args.check_parser:
+        documents = update_sitemap.read_post_documents()
+        all_posts = [get_post_metadata(filepath, content) for filepath, content in documents.items()]
+        related_map = assign_related_posts(all_posts)
+        return 0 if check_parser_equivalence(all_posts, related_map, documents, template) else 1
     
-    for filename in os.listdir(BLOG_DIR):
-        if filename.endswith('.html') and filename != 'index.html':
-            filepath = os.path.join(BLOG_DIR, filename)
-            process_file(filepath, template_content, all_posts)
+    documents, all_posts = build_site(template_content, template, manifest, args.jobs)
     
-    scan_and_build_homepage(all_posts)
-    update_root_homepage(all_posts)
+    if _PROFILER:
+        report = _PROFILER.report()
+        _PROFILER.stop()
+        _PROFILER = None
+        write_file_atomic(args.profile, json.dumps(report, ensure_ascii=False, indent=2))
+        print_profile_summary(report, args.profile_top)
+        print(f"Profile written to {args.profile}")
     
-    update_indices()
+    if args.watch:
+        return watch_site(args, template_content, template, documents, all_posts, manifest)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
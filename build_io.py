@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+
+# Sources (blog/*.html, index.html, layout_template.html, ...) are never
+# written by the build. Everything generated goes to DIST_DIR, which is the
+# directory that gets deployed.
+DIST_DIR = os.environ.get('BUILD_DIST_DIR', 'dist')
+
+# mkstemp creates files as 0600; published files get the usual umask mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+def dist_path(*parts):
+    return os.path.join(DIST_DIR, *parts)
+
+def _replace_atomic(path, write):
+    """
+    Writes through a temp file in the same directory and renames it over
+    path, so a crash never leaves a half-written file behind.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_file_atomic(path, content):
+    """
+    Atomically writes content (str or bytes) to path. Returns False without
+    touching the file (or its mtime) if it already holds exactly that content.
+    """
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    _replace_atomic(path, lambda f: f.write(data))
+    return True
+
+def files_equal(path_a, path_b):
+    if os.path.getsize(path_a) != os.path.getsize(path_b):
+        return False
+    with open(path_a, 'rb') as a, open(path_b, 'rb') as b:
+        while True:
+            chunk = a.read(1 << 16)
+            if chunk != b.read(1 << 16):
+                return False
+            if not chunk:
+                return True
+
+class AtomicFile:
+    """
+    Streaming counterpart of write_file_atomic(): a binary file written
+    through a temp file in directory, for output too large to hold in memory.
+    commit(path) renames it over path unless path already holds the same
+    bytes; discard() drops it.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix='.stream.', suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+        self.size = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.size += len(data)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+    def commit(self, path):
+        """Returns False (and leaves path alone) if it already had this content."""
+        self.close()
+        try:
+            if os.path.exists(path) and files_equal(self.tmp_path, path):
+                os.remove(self.tmp_path)
+                return False
+            os.chmod(self.tmp_path, FILE_MODE)
+            os.replace(self.tmp_path, path)
+        except BaseException:
+            self.discard()
+            raise
+        return True
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def copy_file_atomic(src, dst):
+    """
+    Copies src to dst unless dst already has the same size and mtime.
+    Returns True if the file was copied.
+    """
+    src_stat = os.stat(src)
+    try:
+        dst_stat = os.stat(dst)
+        if dst_stat.st_size == src_stat.st_size and int(dst_stat.st_mtime) == int(src_stat.st_mtime):
+            return False
+    except OSError:
+        pass
+
+    def write(f):
+        with open(src, 'rb') as source:
+            shutil.copyfileobj(source, f)
+    _replace_atomic(dst, write)
+    shutil.copystat(src, dst)
+    return True
+
+def remove_file(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,76 @@
+import os
+import json
+from datetime import datetime
+from build_io import write_file_atomic
+
+# Changed-URL feed for the search engine push scripts (bing_push.py,
+# baidu_push.py). update_sitemap.py hashes the own content of every sitemap
+# URL (see SITEMAP_STATE there); each build diffs those hashes against the
+# previous build and records here when a URL was last added, modified or
+# removed:
+#
+#   {"generated": "2026-01-06T10:00:00",
+#    "urls": [{"url": "https://...", "changed": "2026-01-06T10:00:00", "status": "modified"}, ...]}
+#
+# newest first; within one build added before modified before removed, then
+# in sitemap order (posts, newest first, before the listing pages). That is the
+# order the push scripts submit in. A push script keeps {url: "changed" it
+# submitted} in its own state file and only submits URLs whose entry is newer,
+# so a run cut short by the quota leaves the rest pending instead of losing
+# them.
+
+CHANGED_URLS_FILE = 'changed_urls.json'
+STATUS_ORDER = {'added': 0, 'modified': 1, 'removed': 2}
+
+def load_feed(path=CHANGED_URLS_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'generated': None, 'urls': []}
+
+def update_feed(old_hashes, new_hashes, path=CHANGED_URLS_FILE):
+    """
+    Records the URLs whose hash differs between old_hashes and new_hashes
+    ({url: hash} of the previous and the current build, the latter in push
+    priority order). Returns the number of changed URLs.
+    """
+    now = datetime.now().isoformat(timespec='seconds')
+    changes = {}
+    for url, digest in new_hashes.items():
+        if url not in old_hashes:
+            changes[url] = 'added'
+        elif old_hashes[url] != digest:
+            changes[url] = 'modified'
+    for url in old_hashes:
+        if url not in new_hashes:
+            changes[url] = 'removed'
+    if not changes and os.path.exists(path):
+        return 0
+
+    entries = {entry['url']: entry for entry in load_feed(path)['urls']}
+    for url, status in changes.items():
+        entries[url] = {'url': url, 'changed': now, 'status': status}
+    position = {url: i for i, url in enumerate(new_hashes)}
+    urls = sorted(entries.values(), key=lambda e: (STATUS_ORDER[e['status']], position.get(e['url'], len(position)), e['url']))
+    urls.sort(key=lambda e: e['changed'], reverse=True)
+    write_file_atomic(path, json.dumps({'generated': now, 'urls': urls}, ensure_ascii=False, indent=2))
+    return len(changes)
+
+def load_pushed(state_path):
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get_pending(state_path, statuses=('added', 'modified', 'removed'), path=CHANGED_URLS_FILE):
+    """Feed entries (newest first) not yet submitted by the script keeping state_path."""
+    pushed = load_pushed(state_path)
+    return [entry for entry in load_feed(path)['urls']
+            if entry['status'] in statuses and pushed.get(entry['url']) != entry['changed']]
+
+def mark_pushed(state_path, entries):
+    pushed = load_pushed(state_path)
+    pushed.update({entry['url']: entry['changed'] for entry in entries})
+    write_file_atomic(state_path, json.dumps(pushed, ensure_ascii=False, indent=2, sort_keys=True))
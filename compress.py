@@ -0,0 +1,125 @@
+import os
+import gzip
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from build_io import DIST_DIR, write_file_atomic, remove_file
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Precompressed siblings: every text output in DIST_DIR gets foo.html.gz (and
+# foo.html.br when the brotli module is installed) at the maximum level, so
+# the host / preview server can serve them without compressing per request.
+# gzip is written with mtime=0, so unchanged input gives identical bytes.
+#
+# The build manifest keeps {dist path: [source hash, formats, siblings written]}
+# under "compressed"; files whose entry still holds are skipped, and siblings
+# are only removed through it. The manifest is shared by every BUILD_DIST_DIR,
+# so a build only looks at (and only removes files under) its own DIST_DIR and
+# keeps the entries of the other trees as they are.
+
+COMPRESS_EXTENSIONS = ('.html', '.css', '.js', '.json', '.xml', '.svg', '.txt', '.webmanifest')
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+
+def get_suffixes():
+    return COMPRESSED_SUFFIXES if brotli else COMPRESSED_SUFFIXES[:1]
+
+def compress_data(data, suffix):
+    if suffix == '.gz':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+def compress_file(path):
+    """
+    Writes the siblings of path; one that would not be smaller is removed.
+    Returns (suffixes written, bytes in, bytes out).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    size = 0
+    for suffix in get_suffixes():
+        compressed = compress_data(data, suffix)
+        if len(compressed) < len(data):
+            write_file_atomic(path + suffix, compressed)
+            written.append(suffix)
+            size += len(compressed)
+        else:
+            remove_file(path + suffix)
+    return written, len(data), size
+
+def hash_file(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def is_in_dist_dir(path):
+    dist_dir = os.path.abspath(DIST_DIR)
+    return os.path.commonpath([os.path.abspath(path), dist_dir]) == dist_dir
+
+def list_outputs():
+    for root, dirs, files in os.walk(DIST_DIR):
+        for filename in files:
+            yield os.path.join(root, filename)
+
+def compress_outputs(state, workers=1, paths=None):
+    """
+    Compresses the outputs in DIST_DIR that changed since state (the
+    "compressed" dict of the build manifest, updated in place) was recorded
+    and removes siblings whose source is gone. With paths (DIST_DIR paths
+    written or removed since the last call, from watch mode) only those are
+    looked at and the rest of state is kept. Returns the number of files
+    compressed.
+    """
+    suffixes = get_suffixes()
+    # A new format (brotli installed since the last build) redoes everything
+    formats = '+'.join(suffix[1:] for suffix in suffixes)
+    other_trees = {path: entry for path, entry in state.items() if not is_in_dist_dir(path)}
+    previous = {path: entry for path, entry in state.items() if path not in other_trees}
+    if paths is None:
+        current = {}
+        candidates = list_outputs()
+    else:
+        paths = {path for path in paths if is_in_dist_dir(path)}
+        current = {path: entry for path, entry in previous.items() if path not in paths}
+        candidates = sorted(path for path in paths if os.path.isfile(path))
+    todo = []
+    for path in candidates:
+        filename = os.path.basename(path)
+        if filename.startswith('.') or not filename.endswith(COMPRESS_EXTENSIONS):
+            continue
+        digest = hash_file(path)
+        entry = previous.get(path)
+        if (entry and entry[:2] == [digest, formats]
+                and all(os.path.exists(path + suffix) for suffix in entry[2])):
+            current[path] = entry
+        else:
+            current[path] = [digest, formats]
+            todo.append(path)
+
+    if workers <= 1 or len(todo) <= 1:
+        results = [compress_file(path) for path in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(compress_file, todo, chunksize=max(1, len(todo) // (workers * 4))))
+
+    for path, (written, _, _) in zip(todo, results):
+        current[path].append(written)
+    # Siblings written by an earlier build whose source is gone (or which are
+    # no longer written); other .gz files (sitemap parts) are not ours
+    for path, entry in previous.items():
+        kept = current[path][2] if path in current else []
+        for suffix in entry[2] if len(entry) > 2 else ():
+            if suffix not in kept:
+                remove_file(path + suffix)
+    state.clear()
+    state.update(other_trees)
+    state.update(current)
+    size_in = sum(r[1] for r in results)
+    size_out = sum(r[2] for r in results)
+    print(f"Compressed ({formats.replace('+', ' + ')}): {len(results)} file(s), {size_in // 1024} KB -> "
+          f"{size_out // 1024} KB, unchanged and skipped: {len(current) - len(results)}")
+    if not brotli:
+        print("  (brotli module not installed: no .br files)")
+    return len(results)
@@ -0,0 +1,382 @@
+import os
+import re
+import html
+import json
+import hashlib
+from build_io import DIST_DIR, dist_path
+from stylesheet import STYLESHEET_FILE, STYLESHEET_LINK_PATTERN
+
+# Critical CSS: the compiled Tailwind stylesheet blocks first paint of every
+# page. For each page type the rules its above-the-fold markup can use (nav,
+# header, hero / first posts) are inlined in a <style data-critical>,
+# and the full stylesheet is loaded without blocking (rel=preload + onload,
+# <noscript> link as fallback).
+#
+# "Above the fold" is the first FOLD_CHARS characters of <body> markup, without
+# the icon sprite, scripts, styles and comments. A rule is kept when every class and id
+# in one of its selectors appears there (or the rule has none: preflight,
+# theme variables); :hover / :focus / :active selectors are dropped, nested
+# and @keyframes / @property / @font-face blocks are kept whole.
+#
+# One critical set per page type (template) and stylesheet hash: the rules the
+# template's own above-the-fold markup (its "chrome": nav, header, the article
+# or listing scaffold) can use. Pages of a type share it, whatever their own
+# content shows above the fold. Chrome the build renders into a page type
+# (the article scaffold every post source repeats, the category filter) comes
+# from set_extra_chrome(). Sets are kept in the build manifest under
+# "critical" ({template: [css hash, chrome hash, css]}, bound with use_cache())
+# and only recomputed when the stylesheet or the classes / ids of the
+# template's fold change; the stylesheet is only parsed then.
+#
+# The inline <style> blocks of the templates are not touched; they are already
+# in the page and do not block on the network.
+
+FOLD_CHARS = 10000
+
+# Page type of each published page: posts use the layout template (same file as
+# build.TEMPLATE_FILE), every page under blog/ is built from blog/index.html,
+# and the other pages (index.html, about.html...) are their own template.
+POST_TEMPLATE = 'layout_template.html'
+LISTING_TEMPLATE = 'blog/index.html'
+
+CRITICAL_STYLE_ATTR = 'data-critical'
+CRITICAL_PATTERN = re.compile(
+    r'<style ' + CRITICAL_STYLE_ATTR + r'>.*?</style>'
+    r'<link as="style" href="([^"]+)" onload="[^"]*" rel="preload"/>'
+    r'<noscript><link href="[^"]+" rel="stylesheet"/></noscript>', re.DOTALL)
+STYLESHEET_HREF_PATTERN = re.compile(r'href="([^"]+)"')
+
+BODY_PATTERN = re.compile(r'<body\b[^>]*>', re.IGNORECASE)
+HTML_TAG_PATTERN = re.compile(r'<html\b[^>]*>', re.IGNORECASE)
+SPRITE_PATTERN = re.compile(r'<svg [^>]*id="fa-sprite".*?</svg>', re.DOTALL)
+# Comments too: the fold must not move when the page is minified
+HIDDEN_BLOCK_PATTERN = re.compile(r'<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>|<!--.*?-->',
+                                  re.DOTALL | re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r'[ \t\n\r\f]+')
+ATTR_PATTERN = re.compile(r'\s(class|id)="([^"]*)"')
+
+INTERACTION_PATTERN = re.compile(r'(?<!\\):(?:hover|focus|focus-visible|focus-within|active)\b')
+# Conditional group rules are filtered inside; every other block is kept as it is
+GROUP_RULES = ('@media', '@supports', '@layer', '@container')
+ESCAPE = r'\\(?:[0-9a-fA-F]{1,6}[ \t\n\r\f]?|.)'
+ESCAPE_PATTERN = re.compile(ESCAPE, re.DOTALL)
+IDENTIFIER_PATTERN = re.compile(rf'(?:{ESCAPE}|[\w-]|[^\x00-\x7f])+', re.DOTALL)
+
+# {stat key: (css hash, parsed rules, class/id tokens)}
+_stylesheets = {}
+# {stat key: css hash}
+_stylesheet_hashes = {}
+# {template: (stat key, (fold tokens, chrome hash))}
+_chrome = {}
+# {template: tokens}, see set_extra_chrome()
+_extra_chrome = {}
+# {template: [css hash, chrome hash, critical css]}, the manifest's "critical"
+_cache = {}
+# Templates whose critical set was computed (not reused) this build
+_computed = set()
+
+def split_blocks(css):
+    """Top-level (prelude, body) pairs of css; body is None for "statement;"."""
+    blocks = []
+    start = i = 0
+    depth = 0
+    prelude_end = None
+    n = len(css)
+    while i < n:
+        c = css[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c in '"\'':
+            end = i + 1
+            while end < n and css[end] != c:
+                end += 2 if css[end] == '\\' else 1
+            i = end + 1
+            continue
+        if c == '/' and css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if c == '{':
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((css[start:prelude_end].strip(), css[prelude_end + 1:i]))
+                start = i + 1
+            elif depth < 0:
+                depth = 0
+                start = i + 1
+        elif c == ';' and depth == 0:
+            statement = css[start:i].strip()
+            if statement:
+                blocks.append((statement, None))
+            start = i + 1
+        i += 1
+    return blocks
+
+def split_selectors(prelude):
+    """Splits a selector list at top-level commas."""
+    selectors = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(prelude):
+        c = prelude[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+        i += 1
+    selectors.append(prelude[start:].strip())
+    return [s for s in selectors if s]
+
+def unescape_identifier(name):
+    def replace(match):
+        escaped = match.group(0)[1:]
+        if len(escaped) > 1 or escaped in '0123456789abcdefABCDEF':
+            code = int(escaped.strip(), 16)
+            return chr(code) if 0 < code <= 0x10FFFF else '\ufffd'
+        return escaped
+    return ESCAPE_PATTERN.sub(replace, name)
+
+def selector_tokens(selector):
+    """
+    The classes (".x") and ids ("#x") a selector requires, unescaped.
+    Attribute selectors and :not(...) arguments require nothing.
+    """
+    tokens = set()
+    i = 0
+    n = len(selector)
+    while i < n:
+        c = selector[i]
+        if c == '\\':
+            i += 2
+        elif c == '[':
+            # Attribute selector (may hold quoted "]")
+            i += 1
+            while i < n and selector[i] != ']':
+                if selector[i] in '"\'':
+                    i = selector.find(selector[i], i + 1)
+                    if i < 0:
+                        return tokens
+                elif selector[i] == '\\':
+                    i += 1
+                i += 1
+            i += 1
+        elif selector.startswith(':not(', i):
+            depth = 0
+            while i < n:
+                if selector[i] == '\\':
+                    i += 1
+                elif selector[i] == '(':
+                    depth += 1
+                elif selector[i] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+            i += 1
+        elif c in '.#':
+            match = IDENTIFIER_PATTERN.match(selector, i + 1)
+            end = match.end() if match else i + 1
+            name = selector[i + 1:end]
+            # ".5" in a value such as "translate(.5rem)" is not a class
+            if name and not name[0].isdigit():
+                tokens.add(c + unescape_identifier(name))
+            i = end
+        else:
+            i += 1
+    return tokens
+
+def parse_rules(css):
+    """
+    [(prelude, body, children, [(selector, tokens)])]: children for group
+    rules, selectors for style rules, neither for blocks kept as they are.
+    """
+    rules = []
+    for prelude, body in split_blocks(css):
+        if body is None:
+            rules.append((prelude, None, None, None))
+        elif prelude.startswith(GROUP_RULES):
+            rules.append((prelude, body, parse_rules(body), None))
+        elif prelude.startswith('@'):
+            rules.append((prelude, body, None, None))
+        else:
+            selectors = [(s, selector_tokens(s)) for s in split_selectors(prelude)
+                         if not INTERACTION_PATTERN.search(s)]
+            rules.append((prelude, body, None, selectors))
+    return rules
+
+def collect_tokens(rules, tokens):
+    for prelude, body, children, selectors in rules:
+        if children:
+            collect_tokens(children, tokens)
+        for _, selector_set in selectors or ():
+            tokens.update(selector_set)
+    return tokens
+
+def filter_rules(rules, fold):
+    parts = []
+    for prelude, body, children, selectors in rules:
+        if body is None:
+            parts.append(prelude + ';')
+        elif children is not None:
+            inner = filter_rules(children, fold)
+            if inner:
+                parts.append(prelude + '{' + inner + '}')
+        elif selectors is None:
+            parts.append(prelude + '{' + body + '}')
+        else:
+            kept = [s for s, tokens in selectors if tokens <= fold]
+            if kept:
+                parts.append(','.join(kept) + '{' + body + '}')
+    return ''.join(parts)
+
+def get_stylesheet_key():
+    path = dist_path(STYLESHEET_FILE)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+def hash_stylesheet():
+    """Content hash of the compiled stylesheet (without parsing it), or None."""
+    key = get_stylesheet_key()
+    if key is None:
+        return None
+    if key not in _stylesheet_hashes:
+        with open(key[0], 'rb') as f:
+            _stylesheet_hashes.clear()
+            _stylesheet_hashes[key] = hashlib.sha256(f.read()).hexdigest()
+    return _stylesheet_hashes[key]
+
+def load_stylesheet():
+    """(css hash, parsed rules, tokens) of the compiled stylesheet, or None."""
+    key = get_stylesheet_key()
+    if key is None:
+        return None
+    if key not in _stylesheets:
+        with open(key[0], 'r', encoding='utf-8') as f:
+            css = f.read()
+        rules = parse_rules(css)
+        _stylesheets.clear()
+        _stylesheets[key] = (hashlib.sha256(css.encode('utf-8')).hexdigest(), rules, collect_tokens(rules, set()))
+    return _stylesheets[key]
+
+def get_fold_tokens(content):
+    """Classes and ids of <html>, <body> and the first FOLD_CHARS of visible body markup."""
+    body = BODY_PATTERN.search(content)
+    if not body:
+        return None
+    markup = SPRITE_PATTERN.sub('', content[body.end():])
+    markup = HIDDEN_BLOCK_PATTERN.sub('', markup)
+    markup = WHITESPACE_PATTERN.sub(' ', markup)[:FOLD_CHARS]
+    html_tag = HTML_TAG_PATTERN.search(content)
+    markup = (html_tag.group(0) if html_tag else '') + body.group(0) + markup
+    tokens = set()
+    for attr, value in ATTR_PATTERN.findall(markup):
+        prefix = '.' if attr == 'class' else '#'
+        tokens.update(prefix + name for name in html.unescape(value).split())
+    return tokens
+
+def get_page_template(path):
+    """Source template of the page published at path (a DIST_DIR path)."""
+    name = os.path.relpath(path, DIST_DIR).replace(os.sep, '/')
+    if name.startswith('blog/'):
+        return POST_TEMPLATE if name.count('/') == 1 and name != LISTING_TEMPLATE else LISTING_TEMPLATE
+    return name
+
+def get_chrome_tokens(template):
+    """
+    (fold tokens of the template source plus its extra chrome, their hash), or
+    None if the template cannot be read.
+    """
+    try:
+        stat = os.stat(template)
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size, _extra_chrome.get(template))
+    cached = _chrome.get(template)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(template, 'r', encoding='utf-8') as f:
+        tokens = get_fold_tokens(f.read())
+    if tokens is None:
+        return None
+    tokens |= key[2] or set()
+    chrome = (tokens, hashlib.sha256(' '.join(sorted(tokens)).encode('utf-8')).hexdigest())
+    _chrome[template] = (key, chrome)
+    return chrome
+
+def set_extra_chrome(extra):
+    """
+    {template: class / id tokens} shown above the fold by every page of a type
+    but not by its template source (markup the build renders into it).
+    Returns True if that changed the chrome of a page type.
+    """
+    global _extra_chrome
+    extra = {template: frozenset(tokens) for template, tokens in extra.items()}
+    changed = extra != _extra_chrome
+    _extra_chrome = extra
+    return changed
+
+def use_cache(state):
+    """Keeps the critical sets in state (the "critical" dict of the build manifest)."""
+    global _cache
+    _cache = state
+
+def get_cache_hash():
+    """Hash of the critical sets in use (part of publish.get_publish_key())."""
+    return hashlib.sha256(json.dumps(_cache, sort_keys=True).encode('utf-8')).hexdigest()
+
+def get_critical_css(template):
+    """The critical CSS of a page type, from the cache while it holds."""
+    css_hash = hash_stylesheet()
+    chrome = get_chrome_tokens(template)
+    if css_hash is None or chrome is None:
+        return None
+    tokens, chrome_hash = chrome
+    entry = _cache.get(template)
+    if entry and entry[:2] == [css_hash, chrome_hash]:
+        return entry[2]
+    css_hash, rules, css_tokens = load_stylesheet()
+    critical = filter_rules(rules, tokens & css_tokens)
+    _cache[template] = [css_hash, chrome_hash, critical]
+    _computed.add(template)
+    return critical
+
+def strip_critical_css(content):
+    """Turns an inlined critical block back into the plain stylesheet link."""
+    return CRITICAL_PATTERN.sub(lambda m: f'<link href="{m.group(1)}" rel="stylesheet"/>', content)
+
+def inline_critical_css(content, path):
+    """Inlines the critical CSS of a page that links the compiled stylesheet and defers the link."""
+    link = STYLESHEET_LINK_PATTERN.search(content)
+    if not link:
+        return content
+    critical = get_critical_css(get_page_template(path))
+    if critical is None:
+        return content
+
+    href = STYLESHEET_HREF_PATTERN.search(link.group(0)).group(1)
+    block = (f'<style {CRITICAL_STYLE_ATTR}>{critical}</style>'
+             f'<link as="style" href="{href}" onload="this.onload=null;this.rel=\'stylesheet\'" rel="preload"/>'
+             f'<noscript><link href="{href}" rel="stylesheet"/></noscript>')
+    return content[:link.start()] + block + content[link.end():]
+
+def print_critical_report():
+    if not _cache:
+        return
+    sizes = sorted(len(entry[2].encode('utf-8')) for entry in _cache.values())
+    print(f"Critical CSS: {len(_cache)} page type(s), {len(_computed)} recomputed, "
+          f"{sizes[0] / 1024:.1f}-{sizes[-1] / 1024:.1f} KB")
@@ -0,0 +1,127 @@
+import os
+import re
+import json
+import hashlib
+from build_io import DIST_DIR, dist_path, write_file_atomic, copy_file_atomic, remove_file
+
+# Content-hashed asset names. Every file in DIST_DIR/assets/ is also published
+# as name.<hash>.ext and pages reference that name, so it can be cached as
+# immutable (vercel.json, _headers) and a changed asset always gets a new URL. The plain
+# names stay in place for links from outside the site (shared og:image URLs).
+#
+# DIST_DIR/asset-manifest.json maps "assets/logo.png" -> "assets/logo.<hash>.png".
+# rewrite_asset_urls() maps both plain and previously hashed references to the
+# current name, so it can be applied to a page any number of times.
+
+ASSET_DIR = 'assets'
+ASSET_MANIFEST = 'asset-manifest.json'
+SITE_URL = 'https://gemini-vip.top'
+HASH_LENGTH = 10
+# Same list as the immutable Cache-Control rules in vercel.json and DIST_DIR/_headers
+FINGERPRINT_EXTENSIONS = ('.css', '.js', '.svg', '.png', '.jpg', '.jpeg', '.webp', '.ico', '.woff2')
+
+HASHED_NAME_PATTERN = re.compile(rf'^(.+)\.[0-9a-f]{{{HASH_LENGTH}}}(\.\w+)$')
+# /assets/... as an attribute / JSON value, or behind the site's own origin
+ASSET_URL_PATTERN = re.compile(rf'(?:(?<=[\s"\'(=,])|(?<={re.escape(SITE_URL)}))/{ASSET_DIR}/([\w.-]+(?:/[\w.-]+)*)')
+
+# Netlify / Cloudflare Pages: _headers only has * splats, so it cannot match
+# "name.<10 hex digits>.ext" the way vercel.json does. The source _headers sets
+# no Cache-Control for assets; the DIST_DIR copy gets one rule per published
+# asset instead: immutable for hashed names, must-revalidate for plain ones.
+HEADERS_FILE = '_headers'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+# Cloudflare Pages ignores the rules past the 100th
+MAX_HEADER_RULES = 100
+
+_manifest = None
+
+def load_asset_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(dist_path(ASSET_MANIFEST), 'r', encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+def get_plain_name(name):
+    match = HASHED_NAME_PATTERN.match(name)
+    return match.group(1) + match.group(2) if match else name
+
+def rewrite_asset_urls(content, manifest=None):
+    """Points every /assets/ reference at the current hashed name (or the plain name if it has none)."""
+    if manifest is None:
+        manifest = load_asset_manifest()
+    if f'/{ASSET_DIR}/' not in content:
+        return content
+
+    def replace(m):
+        plain = f'{ASSET_DIR}/{get_plain_name(m.group(1))}'
+        return '/' + manifest.get(plain, plain)
+    return ASSET_URL_PATTERN.sub(replace, content)
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+def list_plain_assets():
+    """URL paths of the unhashed files in DIST_DIR that have a fingerprinted extension."""
+    paths = []
+    for root, dirs, files in os.walk(DIST_DIR):
+        for filename in files:
+            if filename.endswith(FINGERPRINT_EXTENSIONS) and not HASHED_NAME_PATTERN.match(filename):
+                paths.append('/' + os.path.relpath(os.path.join(root, filename), DIST_DIR).replace(os.sep, '/'))
+    return sorted(paths)
+
+def write_headers(manifest):
+    """Publishes _headers with a Cache-Control rule for every asset URL."""
+    if not os.path.exists(HEADERS_FILE):
+        return
+    with open(HEADERS_FILE, 'r', encoding='utf-8') as f:
+        content = f.read().rstrip('\n')
+    rules = [(f'/{hashed}', IMMUTABLE_CACHE_CONTROL) for hashed in sorted(manifest.values())]
+    rules += [(path, REVALIDATE_CACHE_CONTROL) for path in list_plain_assets()]
+    blocks = [content, '# Generated by fingerprint.py']
+    blocks += [f'{path}\n  Cache-Control: {value}' for path, value in rules]
+    write_file_atomic(dist_path(HEADERS_FILE), '\n\n'.join(blocks) + '\n')
+    count = sum(1 for line in content.splitlines() if line.startswith('/')) + len(rules)
+    if count > MAX_HEADER_RULES:
+        print(f"⚠️ {HEADERS_FILE} has {count} rules: Cloudflare Pages only applies the first {MAX_HEADER_RULES}")
+
+def fingerprint_assets():
+    """
+    Publishes a hashed copy of every asset in DIST_DIR/assets/, removes hashed
+    copies no longer in use and writes the asset manifest and _headers.
+    Returns the manifest.
+    """
+    global _manifest
+    manifest = {}
+    hashed_files = []
+    for root, dirs, files in os.walk(dist_path(ASSET_DIR)):
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            if filename.startswith('.') or not filename.endswith(FINGERPRINT_EXTENSIONS):
+                continue
+            if HASHED_NAME_PATTERN.match(filename):
+                hashed_files.append(path)
+                continue
+            stem, ext = os.path.splitext(filename)
+            name = os.path.relpath(path, DIST_DIR).replace(os.sep, '/')
+            manifest[name] = f'{os.path.dirname(name)}/{stem}.{hash_file(path)}{ext}'
+
+    copied = 0
+    for name, hashed in manifest.items():
+        copied += copy_file_atomic(dist_path(name), dist_path(hashed))
+    in_use = {dist_path(hashed) for hashed in manifest.values()}
+    removed = sum(remove_file(path) for path in hashed_files if path not in in_use)
+
+    write_file_atomic(dist_path(ASSET_MANIFEST), json.dumps(manifest, indent=2, sort_keys=True))
+    _manifest = manifest
+    write_headers(manifest)
+    print(f"Fingerprinted assets: {len(manifest)} ({copied} new, {removed} stale removed)")
+    return manifest
@@ -0,0 +1,177 @@
+import os
+import re
+import io
+import html
+import hashlib
+from build_io import DIST_DIR, dist_path, write_file_atomic, remove_file
+from packages import check_locked_version
+
+try:
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+except ImportError:  # optional: pip install fonttools brotli
+    subset = None
+try:
+    import brotli  # woff2 compression for fontTools
+except ImportError:
+    brotli = None
+
+# Self-hosted Inter. Pages load Inter 300/400/600/800 from Google Fonts: a
+# stylesheet on fonts.googleapis.com, then the font files on fonts.gstatic.com
+# (two more origins before text renders). The build subsets the variable font
+# from the local inter-ui package (package.json) to the characters the
+# generated pages use, limited to the weights above, and writes it as
+# DIST_DIR/assets/inter.woff2. Pages then get an inline @font-face
+# (font-display: swap) and a preload for it instead of the Google links
+# (self_host_font, applied through publish.publish_page).
+#
+# The build manifest keeps the hash of (source font, glyphs in use) under
+# "font"; the subset is only regenerated when that changes, not when text
+# changes without adding or dropping a character Inter has.
+#
+# Without fontTools and brotli (requirements.txt) or the font package (npm
+# install, or INTER_FONT pointing at InterVariable.woff2), the subset is
+# removed and pages keep Google Fonts; the build says which one is missing.
+# An installed inter-ui other than the version in package-lock.json is
+# reported (packages.py).
+
+FONT_PACKAGE = 'inter-ui'
+FONT_PACKAGE_DIR = os.path.join('node_modules', FONT_PACKAGE)
+FONT_SOURCE = os.environ.get('INTER_FONT', os.path.join(FONT_PACKAGE_DIR, 'variable', 'InterVariable.woff2'))
+FONT_FILE = os.path.join('assets', 'inter.woff2')
+FONT_URL = '/assets/inter.woff2'
+FONT_FAMILY = 'Inter'
+# The weights pages requested from Google Fonts
+WEIGHT_RANGE = (300, 800)
+# Always in the subset, for text scripts insert at run time (search results)
+BASE_CHARACTERS = ''.join(chr(c) for c in range(0x20, 0x7f)) + ' –—‘’“”…·'
+# Part of the state key: bump when the subsetting changes
+SUBSET_VERSION = 1
+
+GOOGLE_FONTS_MARKUP = ('<link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;800&amp;display=swap" rel="stylesheet"/>\n'
+                       '<link href="https://fonts.googleapis.com" rel="preconnect"/>\n'
+                       '<link crossorigin="" href="https://fonts.gstatic.com" rel="preconnect"/>')
+GOOGLE_STYLESHEET_PATTERN = re.compile(r'<link href="https://fonts\.googleapis\.com/css2\?family=Inter[^"]*" rel="stylesheet"\s*/?>')
+GOOGLE_PRECONNECT_PATTERN = re.compile(r'[ \t]*<link (?:crossorigin="" )?href="https://fonts\.(?:googleapis|gstatic)\.com" rel="preconnect"\s*/?>\n?')
+FONT_FACE = (f"<style data-font>@font-face{{font-family:'{FONT_FAMILY}';font-style:normal;"
+             f"font-weight:{WEIGHT_RANGE[0]} {WEIGHT_RANGE[1]};font-display:swap;"
+             f"src:url({FONT_URL}) format('woff2')}}</style>")
+FONT_PRELOAD = f'<link as="font" crossorigin="" href="{FONT_URL}" rel="preload" type="font/woff2"/>'
+# Also matches the fingerprinted URL (see fingerprint.py)
+SELF_HOSTED_PATTERN = re.compile(r'<link as="font" crossorigin="" href="/assets/inter(?:\.[0-9a-f]+)?\.woff2" rel="preload" type="font/woff2"/>'
+                                 r'<style data-font>.*?</style>', re.DOTALL)
+
+TEXT_SKIP_PATTERN = re.compile(r'<(script|style|svg|template)\b[^>]*>.*?</\1\s*>|<!--.*?-->', re.DOTALL | re.IGNORECASE)
+# Attribute values the browser renders as text
+TEXT_ATTR_PATTERN = re.compile(r'\s(?:alt|title|placeholder|value)="([^"]*)"')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+
+def has_font():
+    return os.path.exists(dist_path(FONT_FILE))
+
+def self_host_font(content, hosted=None):
+    """Swaps the Google Fonts links for the self-hosted subset (or back if there is none)."""
+    if hosted is None:
+        hosted = has_font()
+    if hosted:
+        match = GOOGLE_STYLESHEET_PATTERN.search(content)
+        if not match:
+            return content
+        content = content[:match.start()] + FONT_PRELOAD + FONT_FACE + content[match.end():]
+        return GOOGLE_PRECONNECT_PATTERN.sub('', content)
+    return SELF_HOSTED_PATTERN.sub(lambda m: GOOGLE_FONTS_MARKUP, content)
+
+def page_text(content):
+    """The characters a page can render: text nodes and text attributes."""
+    content = TEXT_SKIP_PATTERN.sub(' ', content)
+    attrs = TEXT_ATTR_PATTERN.findall(content)
+    return html.unescape(TAG_PATTERN.sub(' ', content) + ' '.join(attrs))
+
+def collect_characters():
+    characters = set(BASE_CHARACTERS)
+    for root, dirs, files in os.walk(DIST_DIR):
+        for filename in files:
+            if filename.endswith('.html'):
+                with open(os.path.join(root, filename), 'r', encoding='utf-8') as f:
+                    characters.update(page_text(f.read()))
+    return characters
+
+def subset_font(source, unicodes):
+    """woff2 bytes of source limited to unicodes and WEIGHT_RANGE."""
+    font = TTFont(io.BytesIO(source))
+    if 'fvar' in font:
+        limits = {}
+        for axis in font['fvar'].axes:
+            if axis.axisTag == 'wght':
+                limits['wght'] = (max(axis.minValue, WEIGHT_RANGE[0]), min(axis.maxValue, WEIGHT_RANGE[1]))
+            else:
+                # Optical size, slant...: pinned at the default
+                limits[axis.axisTag] = None
+        font = instancer.instantiateVariableFont(font, limits)
+    options = subset.Options()
+    options.layout_features = ['*']
+    options.name_IDs = [0, 1, 2, 3, 4, 5, 6]
+    options.notdef_outline = True
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font.flavor = 'woff2'
+    font.save(output)
+    return output.getvalue()
+
+def get_subset_key(source, unicodes):
+    key = hashlib.sha256(source)
+    key.update(f'{SUBSET_VERSION}:{WEIGHT_RANGE}:'.encode('utf-8'))
+    key.update(','.join(f'{u:x}' for u in unicodes).encode('utf-8'))
+    return key.hexdigest()
+
+def build_font(state):
+    """
+    Writes the Inter subset for the pages in DIST_DIR, unless the "font" state
+    of the build manifest (updated in place) shows its glyph set is unchanged.
+    Returns True if the font is available; otherwise it is removed, so pages
+    fall back to Google Fonts when they are republished.
+    """
+    output_path = dist_path(FONT_FILE)
+    error = None
+    data = None
+    if subset is None:
+        error = "fontTools is not installed (pip install -r requirements.txt)"
+    elif brotli is None:
+        error = "brotli is not installed, fontTools cannot write woff2 (pip install -r requirements.txt)"
+    elif not os.path.exists(FONT_SOURCE):
+        error = f"Inter source font {FONT_SOURCE} not found (run npm install, or set INTER_FONT to InterVariable.woff2)"
+    else:
+        # An INTER_FONT file is used as given; the package must be the locked version
+        if 'INTER_FONT' not in os.environ:
+            mismatch = check_locked_version(FONT_PACKAGE, FONT_PACKAGE_DIR)
+            if mismatch:
+                print(f"⚠️ {mismatch}, subsetting it anyway")
+        try:
+            with open(FONT_SOURCE, 'rb') as f:
+                source = f.read()
+            # Characters Inter has no glyph for (CJK) do not change the subset
+            cmap = TTFont(io.BytesIO(source)).getBestCmap()
+            unicodes = sorted(u for u in map(ord, collect_characters()) if u in cmap)
+            key = get_subset_key(source, unicodes)
+            if state.get('key') == key and os.path.exists(output_path):
+                print(f"Inter subset unchanged: {len(unicodes)} glyphs ({state.get('size', 0) // 1024} KB)")
+                return True
+            data = subset_font(source, unicodes)
+        except Exception as e:  # fontTools raises many types for a bad font
+            error = f"cannot subset {FONT_SOURCE}: {str(e) or type(e).__name__}"
+
+    if error is not None:
+        print(f"⚠️ {error}")
+        print("⚠️ Inter is NOT self-hosted: pages keep loading it from Google Fonts")
+        remove_file(output_path)
+        state.clear()
+        return False
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    write_file_atomic(output_path, data)
+    state.clear()
+    state.update({'key': key, 'size': len(data)})
+    print(f"✅ Inter subset: {FONT_URL} ({len(unicodes)} glyphs, {len(data) // 1024} KB)")
+    return True
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import html
+from packages import check_locked_version
+
+# Font Awesome without the webfont: every <i class="fa-..."></i> in a published
+# page becomes an inline <svg> that <use>s a symbol from a per-page sprite
+# holding only the icons that page uses, and the all.min.css link (plus its
+# ~300 KB of webfonts) is dropped. Icon paths come from the local
+# @fortawesome/fontawesome-free package (package.json). The <svg> keeps the
+# original classes, so Tailwind utilities and page CSS (.fa-arrow-right)
+# still apply.
+#
+# A page with an icon that cannot be resolved, or a build without the package
+# (npm install not run), is left as it is: Font Awesome from the CDN, with a
+# warning; a package other than the version in package-lock.json is used with
+# a warning. On a deploy (CI, Vercel, Netlify, Cloudflare Pages) each of them
+# raises IconError and fails the build instead.
+
+FONTAWESOME_PACKAGE = '@fortawesome/fontawesome-free'
+FONTAWESOME_DIR = os.environ.get('FONTAWESOME_DIR', os.path.join('node_modules', *FONTAWESOME_PACKAGE.split('/')))
+ICON_METADATA = os.path.join('metadata', 'icon-families.json')
+
+FA_STYLESHEET_PATTERN = re.compile(r'<link href="https://cdnjs\.cloudflare\.com/ajax/libs/font-awesome/[^"]+/all\.min\.css" rel="stylesheet"\s*/?>\n?')
+ICON_PATTERN = re.compile(r'<i\b([^>]*?)\sclass="([^"]*\bfa-[^"]*)"([^>]*)>\s*</i>')
+BODY_PATTERN = re.compile(r'<body\b[^>]*>')
+HEAD_END = '</head>'
+SPRITE_ID = 'fa-sprite'
+
+# Class -> style; a later entry wins, as in all.min.css
+STYLE_CLASSES = {'fa-solid': 'solid', 'fas': 'solid', 'fa-regular': 'regular', 'far': 'regular',
+                 'fa-brands': 'brands', 'fab': 'brands'}
+STYLE_ORDER = ('solid', 'regular', 'brands')
+ICON_CSS = ('.svg-inline--fa{display:inline-block;height:1em;overflow:visible;'
+            'vertical-align:-.125em;fill:currentColor}')
+# all.min.css modifiers, for the ones a page uses
+MODIFIER_CSS = {
+    'fa-fw': '.svg-inline--fa.fa-fw{width:1.25em}',
+    'fa-xs': '.svg-inline--fa.fa-xs{font-size:.75em;line-height:.0833em;vertical-align:.125em}',
+    'fa-sm': '.svg-inline--fa.fa-sm{font-size:.875em;line-height:.0714em;vertical-align:.0536em}',
+    'fa-lg': '.svg-inline--fa.fa-lg{font-size:1.25em;line-height:.05em;vertical-align:-.2em}',
+    'fa-xl': '.svg-inline--fa.fa-xl{font-size:1.5em;line-height:.0417em;vertical-align:-.25em}',
+    'fa-2xl': '.svg-inline--fa.fa-2xl{font-size:2em;line-height:.03125em;vertical-align:-.3125em}',
+    'fa-spin': ('.svg-inline--fa.fa-spin{animation:fa-spin 2s linear infinite}'
+                '@keyframes fa-spin{0%{transform:rotate(0)}to{transform:rotate(1turn)}}'),
+}
+MODIFIER_CSS.update({f'fa-{n}x': f'.svg-inline--fa.fa-{n}x{{font-size:{n}em}}' for n in range(1, 11)})
+IGNORED_CLASSES = {'fa', 'fa-classic'}
+# Environment variables set by the CI / hosting builds
+STRICT_ENV = ('CI', 'VERCEL', 'NETLIFY', 'CF_PAGES')
+ICONS_STRICT = any(os.environ.get(name) for name in STRICT_ENV)
+
+_icons = None
+
+class IconError(Exception):
+    pass
+
+def report_icon_error(message, fallback):
+    if ICONS_STRICT:
+        raise IconError(message)
+    print(f"⚠️ {message}, {fallback}")
+
+def load_icons():
+    """{name or alias: {style: (viewBox, path)}} from the Font Awesome package, {} if it is not installed."""
+    global _icons
+    if _icons is not None:
+        return _icons
+    _icons = {}
+    try:
+        with open(os.path.join(FONTAWESOME_DIR, ICON_METADATA), 'r', encoding='utf-8') as f:
+            families = json.load(f)
+    except (OSError, ValueError) as e:
+        report_icon_error(f"Font Awesome package not found (run npm install): {e}", "pages keep the CDN stylesheet")
+        return _icons
+    error = check_locked_version(FONTAWESOME_PACKAGE, FONTAWESOME_DIR)
+    if error:
+        report_icon_error(error, "using it anyway")
+    for name, icon in families.items():
+        styles = {}
+        for style, svg in icon.get('svgs', {}).get('classic', {}).items():
+            if style in STYLE_ORDER and isinstance(svg.get('path'), str):
+                styles[style] = (' '.join(str(n) for n in svg['viewBox']), svg['path'])
+        if not styles:
+            continue
+        _icons[name] = styles
+        for alias in icon.get('aliases', {}).get('names', []):
+            _icons.setdefault(alias, styles)
+    return _icons
+
+def resolve_icon(classes, icons):
+    """(style, name, modifiers) for the classes of one <i>, or None."""
+    style = 'solid'
+    name = None
+    modifiers = []
+    for cls in classes:
+        if cls in STYLE_CLASSES:
+            style = STYLE_CLASSES[cls]
+        elif cls in MODIFIER_CSS:
+            modifiers.append(cls)
+        elif cls.startswith('fa-') and cls not in IGNORED_CLASSES:
+            if name is not None or cls[3:] not in icons:
+                return None
+            name = cls[3:]
+    if name is None:
+        return None
+    styles = icons[name]
+    # A glyph missing from the requested font rendered blank; use the other style
+    if style not in styles:
+        style = next(s for s in STYLE_ORDER if s in styles)
+    return style, name, modifiers
+
+def inline_icons(content):
+    """Replaces the Font Awesome webfont icons of a page with an inline SVG sprite."""
+    if 'fa-' not in content or not FA_STYLESHEET_PATTERN.search(content):
+        return content
+    icons = load_icons()
+    if not icons:
+        return content
+
+    symbols = {}
+    css = {ICON_CSS}
+    failed = []
+
+    def replace(match):
+        before, class_attr, after = match.groups()
+        resolved = resolve_icon(class_attr.split(), icons)
+        if resolved is None:
+            failed.append(class_attr)
+            return match.group(0)
+        style, name, modifiers = resolved
+        view_box, path = icons[name][style]
+        symbol_id = f'fa-{style}-{name}'
+        symbols[symbol_id] = f'<symbol id="{symbol_id}" viewBox="{view_box}"><path d="{html.escape(path)}"/></symbol>'
+        css.update(MODIFIER_CSS[m] for m in modifiers)
+        hidden = '' if 'aria-hidden' in before + after else ' aria-hidden="true"'
+        return (f'<svg{before}{hidden} class="{class_attr} svg-inline--fa"{after} viewBox="{view_box}">'
+                f'<use href="#{symbol_id}"></use></svg>')
+
+    new_content = ICON_PATTERN.sub(replace, content)
+    if failed:
+        report_icon_error(f"Unknown Font Awesome icon ({failed[0]})", "page keeps the CDN stylesheet")
+        return content
+    body = BODY_PATTERN.search(new_content)
+    if not symbols:
+        return FA_STYLESHEET_PATTERN.sub('', new_content, count=1)
+    if not body or HEAD_END not in new_content:
+        return content
+
+    sprite = (f'<svg aria-hidden="true" id="{SPRITE_ID}" style="position:absolute;width:0;height:0;overflow:hidden">'
+              + ''.join(symbols[k] for k in sorted(symbols)) + '</svg>')
+    new_content = new_content[:body.end()] + sprite + new_content[body.end():]
+    style = '<style>' + ''.join(sorted(css)) + '</style>'
+    new_content = new_content.replace(HEAD_END, style + HEAD_END, 1)
+    return FA_STYLESHEET_PATTERN.sub('', new_content, count=1)
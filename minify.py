@@ -0,0 +1,96 @@
+import re
+import json
+
+# Output HTML minifier (applied through publish.publish_page). Collapses the
+# indentation of the f-string templates and the pretty-printed JSON-LD, drops
+# comments, and leaves everything whose whitespace matters alone:
+#   <pre>, <textarea>       copied verbatim
+#   JSON-LD                 re-serialized compactly (same data)
+#   other inline <script>   only line indentation removed, newlines kept (ASI);
+#                           untouched if it has template literals or line continuations
+#   <style>                 comments and whitespace around { } ; removed
+#   markup                  whitespace runs -> one space (or one newline)
+# minify_html(minify_html(x)) == minify_html(x).
+
+RAW_PATTERN = re.compile(r'<(pre|textarea|script|style)\b[^>]*>.*?</\1\s*>|<!--.*?-->', re.DOTALL | re.IGNORECASE)
+SCRIPT_PATTERN = re.compile(r'(<script\b[^>]*>)(.*?)(</script\s*>)', re.DOTALL | re.IGNORECASE)
+JSON_LD_TYPE_PATTERN = re.compile(r'\btype=["\']?application/ld\+json', re.IGNORECASE)
+# HTML whitespace only: a literal U+00A0 is content
+WHITESPACE_PATTERN = re.compile(r'[ \t\n\r\f]+')
+HEAD_END_PATTERN = re.compile(r'</head\s*>', re.IGNORECASE)
+TAG_GAP_PATTERN = re.compile(r'>[ \t\n\r\f]+<')
+SCRIPT_INDENT_PATTERN = re.compile(r'[ \t]*\n[ \t\n\r\f]*')
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_GAP_PATTERN = re.compile(r'\s*([{};])\s*')
+
+def collapse_whitespace(match):
+    return '\n' if '\n' in match.group(0) else ' '
+
+def minify_script(block):
+    match = SCRIPT_PATTERN.match(block)
+    if not match:
+        return block
+    open_tag, body, close_tag = match.groups()
+    if JSON_LD_TYPE_PATTERN.search(open_tag):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return block
+        # "</" must not end the script element early
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    elif '`' in body or '\\\n' in body:
+        return block
+    else:
+        body = SCRIPT_INDENT_PATTERN.sub('\n', body).strip()
+        if body:
+            body = '\n' + body + '\n'
+    return open_tag + body + close_tag
+
+def minify_style(block):
+    end = block.index('>') + 1
+    start = block.lower().rindex('</style')
+    css = CSS_COMMENT_PATTERN.sub('', block[end:start])
+    css = CSS_GAP_PATTERN.sub(r'\1', WHITESPACE_PATTERN.sub(' ', css)).strip()
+    return block[:end] + css + block[start:]
+
+def minify_markup(text, in_head=False):
+    if in_head:
+        # Whitespace between tags in <head> is never rendered (and every
+        # neighbouring raw block is a tag too)
+        return TAG_GAP_PATTERN.sub('><', text).strip(' \t\n\r\f')
+    return WHITESPACE_PATTERN.sub(collapse_whitespace, text)
+
+def strip_comments(content):
+    """Drops comments (except conditional comments), but not "<!--" inside scripts and <pre>."""
+    def replace(match):
+        block = match.group(0)
+        if match.group(1) or block.startswith('<!--[if'):
+            return block
+        return ''
+    return RAW_PATTERN.sub(replace, content)
+
+def minify_html(content):
+    content = strip_comments(content)
+    head_match = HEAD_END_PATTERN.search(content)
+    head_end = head_match.start() if head_match else 0
+
+    def markup(start, end):
+        if start >= head_end:
+            return minify_markup(content[start:end])
+        split = min(end, head_end)
+        return minify_markup(content[start:split], in_head=True) + minify_markup(content[split:end])
+
+    parts = []
+    pos = 0
+    for match in RAW_PATTERN.finditer(content):
+        parts.append(markup(pos, match.start()))
+        tag = (match.group(1) or '').lower()
+        if tag == 'script':
+            parts.append(minify_script(match.group(0)))
+        elif tag == 'style':
+            parts.append(minify_style(match.group(0)))
+        else:
+            parts.append(match.group(0))
+        pos = match.end()
+    parts.append(markup(pos, len(content)))
+    return ''.join(parts)
@@ -0,0 +1,37 @@
+import os
+import json
+
+# npm packages the build reads files from (Font Awesome icons, the Inter font).
+# package-lock.json pins their versions; the build checks that node_modules
+# holds exactly those, so a deploy never publishes icons or glyphs from a
+# version nobody reviewed (npm install run against a stale lock, a cached
+# node_modules).
+
+LOCK_FILE = 'package-lock.json'
+
+def get_locked_version(name):
+    """Version of the npm package name in package-lock.json, or None."""
+    try:
+        with open(LOCK_FILE, 'r', encoding='utf-8') as f:
+            lock = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return lock.get('packages', {}).get(f'node_modules/{name}', {}).get('version')
+
+def get_installed_version(package_dir):
+    """Version in the package.json of an installed package, or None."""
+    try:
+        with open(os.path.join(package_dir, 'package.json'), 'r', encoding='utf-8') as f:
+            return json.load(f).get('version')
+    except (OSError, ValueError):
+        return None
+
+def check_locked_version(name, package_dir):
+    """An error message if package_dir does not hold the locked version of name, else None."""
+    locked = get_locked_version(name)
+    if locked is None:
+        return f"{name} is not in {LOCK_FILE}"
+    installed = get_installed_version(package_dir)
+    if installed != locked:
+        return f"{package_dir} is {name} {installed or '(no package.json)'}, {LOCK_FILE} pins {locked} (run npm ci)"
+    return None
@@ -0,0 +1,86 @@
+import os
+import hashlib
+from build_io import DIST_DIR, dist_path, write_file_atomic
+from stylesheet import STYLESHEET_FILE, link_stylesheet
+from fingerprint import ASSET_MANIFEST, rewrite_asset_urls
+from minify import minify_html
+from icons import inline_icons
+from fonts import FONT_FILE, self_host_font
+from critical_css import strip_critical_css, inline_critical_css, get_cache_hash
+
+# Output transforms for everything published to DIST_DIR: links to other build
+# outputs (the compiled stylesheet, the Inter subset, fingerprinted assets),
+# Font Awesome icons as inline SVG, critical CSS and HTML minification.
+# Writers apply publish_page() so pages come out final, and republish_pages()
+# runs once the stylesheet and the assets are done, for pages written before
+# they changed (get_publish_key() tells whether they did).
+# Every transform must give the same result when applied to its own output.
+
+PUBLISHED_EXTENSIONS = ('.html', '.webmanifest')
+MINIFY_REPORT_TOP = 10
+# Build outputs and code publish_page() reads besides the page itself
+PUBLISH_INPUTS = [STYLESHEET_FILE, FONT_FILE, ASSET_MANIFEST]
+PUBLISH_CODE_FILES = ['publish.py', 'stylesheet.py', 'fingerprint.py', 'minify.py', 'icons.py',
+                      'fonts.py', 'critical_css.py']
+
+# {path: (bytes before minification, bytes after)} for pages published this build
+minify_savings = {}
+
+def publish_page(content, path):
+    """content as published at path (a DIST_DIR path)."""
+    # The critical CSS is recomputed from the plain link (the stylesheet may have changed)
+    content = rewrite_asset_urls(self_host_font(link_stylesheet(strip_critical_css(content))))
+    if not path.endswith('.html'):
+        return content
+    content = inline_critical_css(inline_icons(content), path)
+    minified = minify_html(content)
+    before, after = len(content.encode('utf-8')), len(minified.encode('utf-8'))
+    # Republishing an already minified page saves nothing and is not a new entry
+    if before > after and path not in minify_savings:
+        minify_savings[path] = (before, after)
+    return minified
+
+def print_minify_report(top=MINIFY_REPORT_TOP):
+    pages = [(before - after, before, path) for path, (before, after) in minify_savings.items()]
+    if not pages:
+        return
+    total_before = sum(before for _, before, _ in pages)
+    total_saved = sum(saved for saved, _, _ in pages)
+    print(f"HTML minified: {len(pages)} page(s), {total_before / 1024:.1f} KB -> "
+          f"{(total_before - total_saved) / 1024:.1f} KB (-{total_saved / max(total_before, 1):.1%})")
+    for saved, before, path in sorted(pages, reverse=True)[:top]:
+        print(f"  -{saved / 1024:6.1f} KB ({saved / before:5.1%})  {path}")
+
+def get_publish_key():
+    """
+    Hash of what publish_page() reads besides the page: the compiled
+    stylesheet, the Inter subset and the asset manifest in DIST_DIR, the
+    critical CSS sets and the transform code. Pages published under the same
+    key need no republishing.
+    """
+    digest = hashlib.sha256()
+    code_dir = os.path.dirname(os.path.abspath(__file__))
+    paths = [dist_path(name) for name in PUBLISH_INPUTS] + [os.path.join(code_dir, name) for name in PUBLISH_CODE_FILES]
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            digest.update(b'-')
+    digest.update(get_cache_hash().encode('utf-8'))
+    return digest.hexdigest()
+
+def republish_pages():
+    """Re-applies publish_page() to DIST_DIR. Returns the paths that changed."""
+    changed = []
+    for root, dirs, files in os.walk(DIST_DIR):
+        for filename in files:
+            if not filename.endswith(PUBLISHED_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            if write_file_atomic(path, publish_page(content, path)):
+                changed.append(path)
+    print(f"Pages republished: {len(changed)}")
+    return changed
@@ -0,0 +1,98 @@
+import re
+import html
+import json
+import unicodedata
+from build_io import dist_path, write_file_atomic, remove_file
+
+# Client-side search index, written to DIST_DIR/search/ and queried by
+# assets/search.js:
+#   search/meta.json  {"version", "shards", "docs": [[url, title, date, summary], ...]}
+#   search/<n>.json   {token: [doc, score, doc, score, ...]} for every token with
+#                     get_shard(token) == n
+# Tokens are CJK character bigrams (a lone CJK character stays a unigram) and
+# lowercase Latin/digit words. Shards are keyed by the first character of the
+# token, so a query only fetches the shards of its own tokens, and prefix
+# matches (a single CJK character, a half-typed word) stay inside one shard.
+# search.js implements the same tokenize() and get_shard(): keep them in sync.
+
+SEARCH_DIR = 'search'
+SEARCH_SHARDS = 16
+SEARCH_INDEX_VERSION = 1
+FIELD_WEIGHTS = {'title': 5, 'tags': 3, 'summary': 3, 'body': 1}
+SUMMARY_LENGTH = 80
+
+TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+')
+ARTICLE_PATTERN = re.compile(r'<article\b[^>]*>(.*?)</article>', re.DOTALL)
+MAIN_PATTERN = re.compile(r'<main\b[^>]*>(.*?)</main>', re.DOTALL)
+SKIP_PATTERN = re.compile(r'<(script|style|nav)\b[^>]*>.*?</\1>', re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+def tokenize(text):
+    tokens = []
+    for run in TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', text).lower()):
+        if run[0] < '\u3040':
+            # Latin / digits: drop one-letter words, keep numbers ("Gemini 3")
+            if len(run) > 1 or run.isdigit():
+                tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+def get_shard(token):
+    return ord(token[0]) % SEARCH_SHARDS
+
+def extract_body_text(content):
+    """Readable text of a post: its <article> (or <main>) without scripts, styles and navs."""
+    match = ARTICLE_PATTERN.search(content) or MAIN_PATTERN.search(content)
+    body = match.group(1) if match else content
+    body = SKIP_PATTERN.sub(' ', body)
+    return html.unescape(TAG_PATTERN.sub(' ', body))
+
+def build_search_index(documents, all_posts):
+    """
+    Writes the sharded index for all_posts (bodies taken from the documents
+    store). Unchanged shards are not rewritten. Returns the number of bytes
+    written for the index (meta + shards).
+    """
+    docs = []
+    shards = [{} for _ in range(SEARCH_SHARDS)]
+    for doc_id, post in enumerate(sorted(all_posts, key=lambda p: p['url'])):
+        summary = html.unescape(post.get('summary', ''))
+        if len(summary) > SUMMARY_LENGTH:
+            summary = summary[:SUMMARY_LENGTH] + '…'
+        docs.append([f"/blog/{post['url']}", html.unescape(post['title']), post.get('date', ''), summary])
+
+        fields = {
+            'title': html.unescape(post['title']),
+            'tags': ' '.join(html.unescape(t) for t in post['tags']),
+            'summary': html.unescape(post.get('summary', '')),
+            'body': extract_body_text(documents.get(post['filepath'], '')),
+        }
+        scores = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                scores[token] = scores.get(token, 0) + weight
+        for token, score in scores.items():
+            shards[get_shard(token)].setdefault(token, []).extend((doc_id, score))
+
+    meta = {'version': SEARCH_INDEX_VERSION, 'shards': SEARCH_SHARDS, 'docs': docs}
+    written = [json.dumps(meta, ensure_ascii=False, separators=(',', ':'))]
+    write_file_atomic(dist_path(SEARCH_DIR, 'meta.json'), written[0])
+    for n, shard in enumerate(shards):
+        data = json.dumps(shard, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        write_file_atomic(dist_path(SEARCH_DIR, f'{n}.json'), data)
+        written.append(data)
+    # Shards of a previous, larger SEARCH_SHARDS
+    n = SEARCH_SHARDS
+    while remove_file(dist_path(SEARCH_DIR, f'{n}.json')):
+        n += 1
+
+    total = sum(len(data.encode('utf-8')) for data in written)
+    tokens = sum(len(shard) for shard in shards)
+    largest = max(len(data.encode('utf-8')) for data in written[1:])
+    print(f"✅ Search index: {len(docs)} posts, {tokens} tokens in {SEARCH_SHARDS} shards "
+          f"({total // 1024} KB total, largest shard {largest // 1024} KB)")
+    return total
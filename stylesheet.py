@@ -0,0 +1,178 @@
+import os
+import re
+import html
+import subprocess
+import tempfile
+from build_io import DIST_DIR, dist_path, write_file_atomic, remove_file
+
+# Tailwind, compiled at build time. Source pages load the Play CDN runtime
+# (<script src="https://cdn.tailwindcss.com">), which compiles CSS in the
+# browser on every page view. The build scans the generated HTML in DIST_DIR
+# with the local CLI (@tailwindcss/cli from package.json) and writes one
+# purged, minified stylesheet; pages then link it instead of the runtime
+# (link_stylesheet, applied through publish.publish_page).
+#
+# A page links the stylesheet iff DIST_DIR/assets/tailwind.css exists. If the
+# CLI is missing or fails (npm install not run, no binary for this platform),
+# the stylesheet is removed and every page keeps the CDN script.
+#
+# The CLI is Tailwind v4, the CDN runtime v3: class names in the pages must
+# mean the same in both. v4 rescaled the -sm blur, shadow and radius steps,
+# so those are written as arbitrary values (blur-[4px]); build_stylesheet()
+# warns about pages that still use them. Every other v3-only name (removed or
+# renamed in v4, a v3 plugin) just gets no CSS from v4, so build_stylesheet()
+# also compares the classes of the pages with the ones the compiled
+# stylesheet (or the page's own <style>) has rules for and warns about the
+# rest, typos included.
+
+TAILWIND_CLI = os.environ.get('TAILWIND_CLI', os.path.join('node_modules', '.bin', 'tailwindcss'))
+TAILWIND_TIMEOUT = 120
+STYLESHEET_FILE = os.path.join('assets', 'tailwind.css')
+STYLESHEET_URL = '/assets/tailwind.css'
+# Files whose class names end up in the stylesheet
+STYLESHEET_SOURCES = ['**/*.html', 'assets/*.js']
+
+CDN_SCRIPT = '<script src="https://cdn.tailwindcss.com"></script>'
+CDN_SCRIPT_PATTERN = re.compile(r'<script src="https://cdn\.tailwindcss\.com[^"]*"></script>')
+STYLESHEET_LINK = f'<link href="{STYLESHEET_URL}" rel="stylesheet"/>'
+# Also matches the fingerprinted URL (see fingerprint.py)
+STYLESHEET_LINK_PATTERN = re.compile(r'<link href="/assets/tailwind(?:\.[0-9a-f]+)?\.css" rel="stylesheet"/>')
+
+# Names v4 gives another size than the v3 CDN runtime (the ones it removed
+# are caught by find_unstyled_classes)
+V3_ONLY_CLASS_PATTERN = re.compile(
+    r'(?<=[\s":])(?:(?:backdrop-)?blur-sm|(?:drop-)?shadow-sm|rounded(?:-[trblse]{1,2})?-sm)(?=[\s"])')
+# Class names that have no rules of their own: group / peer markers
+# (group/btn), not-prose, highlighter languages and Font Awesome names (icons.py
+# checks those)
+MARKER_CLASS_PATTERN = re.compile(r'(?:group|peer)(?:/[\w-]+)?|not-prose|language-.*|fa|fa[srb]|fa-.*')
+CLASS_ATTR_PATTERN = re.compile(r'\sclass="([^"]*)"')
+STYLE_BLOCK_PATTERN = re.compile(r'<style\b[^>]*>(.*?)</style>', re.DOTALL)
+SCRIPT_BLOCK_PATTERN = re.compile(r'<script\b[^>]*>(.*?)</script>', re.DOTALL)
+
+def has_stylesheet():
+    return os.path.exists(dist_path(STYLESHEET_FILE))
+
+def link_stylesheet(content, linked=None):
+    """Swaps the Tailwind CDN script for the compiled stylesheet (or back if there is none)."""
+    if linked is None:
+        linked = has_stylesheet()
+    if linked:
+        return CDN_SCRIPT_PATTERN.sub(STYLESHEET_LINK, content)
+    return STYLESHEET_LINK_PATTERN.sub(CDN_SCRIPT, content)
+
+def get_tailwind_input():
+    dist = os.path.abspath(DIST_DIR).replace(os.sep, '/')
+    lines = ['@import "tailwindcss" source(none);']
+    lines += [f'@source "{dist}/{pattern}";' for pattern in STYLESHEET_SOURCES]
+    return '\n'.join(lines) + '\n'
+
+def run_tailwind(output_path):
+    """Runs the Tailwind CLI. Returns None on success, else a short error message."""
+    if not os.path.exists(TAILWIND_CLI):
+        return f"{TAILWIND_CLI} not found (run npm install)"
+    # The input file has to sit in the project so "tailwindcss" resolves from node_modules
+    fd, input_path = tempfile.mkstemp(dir='.', prefix='.tailwind.', suffix='.css')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(get_tailwind_input())
+        result = subprocess.run([TAILWIND_CLI, '--input', input_path, '--output', output_path, '--minify'],
+                                capture_output=True, text=True, timeout=TAILWIND_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return str(e)
+    finally:
+        remove_file(input_path)
+    if result.returncode != 0:
+        lines = (result.stderr or result.stdout).strip().splitlines()
+        errors = [line for line in lines if line.startswith(('Error', 'error'))]
+        return (errors or lines or [f"exit status {result.returncode}"])[0][:200]
+    return None
+
+def collect_css_classes(css, classes):
+    # critical_css imports this module
+    from critical_css import split_blocks, split_selectors, selector_tokens
+    for prelude, body in split_blocks(css):
+        if body is None:
+            continue
+        if prelude.startswith('@'):
+            # @media, @supports, @layer...; @keyframes steps are not selectors
+            if not prelude.startswith(('@keyframes', '@font-face', '@property')):
+                collect_css_classes(body, classes)
+            continue
+        for selector in split_selectors(prelude):
+            classes.update(token[1:] for token in selector_tokens(selector) if token.startswith('.'))
+    return classes
+
+def get_css_classes(css, cache=None):
+    """Class names css has rules for (nested rules and :hover selectors included)."""
+    if cache is not None and css in cache:
+        return cache[css]
+    classes = collect_css_classes(css, set())
+    if cache is not None:
+        cache[css] = classes
+    return classes
+
+def find_class_problems(css):
+    """
+    ({v3-only class: first page}, {class without rules: first page}) for the
+    pages in DIST_DIR and their compiled stylesheet css. Classes scripts of
+    the page refer to are hooks, not styles.
+    """
+    from critical_css import strip_critical_css
+    styled = get_css_classes(css)
+    page_styles = {}
+    v3_only = {}
+    unstyled = {}
+    for root, dirs, files in os.walk(DIST_DIR):
+        for filename in files:
+            if not filename.endswith('.html'):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                content = strip_critical_css(f.read())
+            for name in V3_ONLY_CLASS_PATTERN.findall(content):
+                v3_only.setdefault(name, path)
+            local = set()
+            for block in STYLE_BLOCK_PATTERN.findall(content):
+                local |= get_css_classes(block, page_styles)
+            scripts = ' '.join(SCRIPT_BLOCK_PATTERN.findall(content))
+            for value in CLASS_ATTR_PATTERN.findall(content):
+                for name in html.unescape(value).split():
+                    if (name in styled or name in local or name in unstyled
+                            or MARKER_CLASS_PATTERN.fullmatch(name) or name in scripts):
+                        continue
+                    unstyled[name] = path
+    return v3_only, unstyled
+
+def build_stylesheet():
+    """
+    Compiles DIST_DIR/assets/tailwind.css from the generated pages. Returns
+    True if it succeeded; otherwise the stylesheet is removed, so pages fall
+    back to the CDN script when they are republished.
+    """
+    output_path = dist_path(STYLESHEET_FILE)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), prefix='.tailwind.', suffix='.tmp')
+    os.close(fd)
+    try:
+        error = run_tailwind(tmp_path)
+        if error is None:
+            with open(tmp_path, 'rb') as f:
+                css = f.read()
+            if not css.strip():
+                error = "empty output"
+    finally:
+        remove_file(tmp_path)
+
+    if error is not None:
+        print(f"⚠️ Tailwind CLI failed, pages keep {CDN_SCRIPT}: {error}")
+        remove_file(output_path)
+        return False
+    v3_only, unstyled = find_class_problems(css.decode('utf-8'))
+    for name, path in sorted(v3_only.items()):
+        print(f"⚠️ {path}: class {name} is Tailwind v3 only, it renders differently in {STYLESHEET_URL}")
+    for name, path in sorted(unstyled.items()):
+        print(f"⚠️ {path}: class {name} has no rules in {STYLESHEET_URL} (v3 only, a plugin or a typo)")
+    write_file_atomic(output_path, css)
+    print(f"✅ Tailwind stylesheet: {STYLESHEET_URL} ({len(css) // 1024} KB)")
+    return True
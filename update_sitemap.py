@@ -1,92 +1,309 @@
 import os
 import re
 import json
+import gzip
+import hashlib
+import subprocess
 from datetime import datetime
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from xml.sax.saxutils import escape
+from build_io import DIST_DIR, dist_path, write_file_atomic, remove_file, AtomicFile
+from publish import publish_page
+from changed_urls import update_feed
 
 BLOG_DIR = 'blog'
 DOMAIN = "https://gemini-vip.top"
+# Written to the dist tree (see build_io.DIST_DIR)
 SITEMAP_XML = 'sitemap.xml'
 POSTS_JSON = 'posts.json'
+SITEMAP_HTML = 'sitemap.html'
+
+# sitemap.xml is streamed to disk entry by entry. Past the protocol limits
+# (50,000 URLs or 50 MB per file) it becomes a sitemap index of
+# sitemap-1.xml, sitemap-2.xml, ... (sitemap-N.xml.gz with SITEMAP_GZIP=1;
+# robots.txt keeps pointing at sitemap.xml). Files whose content did not
+# change are not rewritten.
+#
+# lastmod is the date the page's own content last changed. SITEMAP_STATE
+# (committed with the sources, so a deploy from a clean checkout sees it)
+# keeps {url: [content hash, lastmod]}. The hash covers only what the page
+# itself is made of: a post's source file, a static page's source, and for
+# the listing pages also the title / url / date of every post they list, never
+# the rendered related cards or archive nav. When the hash changes, lastmod
+# becomes the date of the last git commit of the source (the build date if it
+# has uncommitted changes), and for a listing page at least the newest lastmod
+# of its posts; a post is never older than its publication date. The URLs
+# whose hash changed go to the changed-URL feed (changed_urls.py).
+SITEMAP_PART = 'sitemap-{}.xml'
+SITEMAP_STATE = '.sitemap_state.json'
+SITEMAP_GZIP = os.environ.get('SITEMAP_GZIP') == '1'
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+# source: the file the page is built from; listing: it lists every post
+STATIC_PAGES = [
+    {'loc': f'{DOMAIN}/', 'priority': '1.0', 'changefreq': 'weekly', 'source': 'index.html', 'listing': True},
+    {'loc': f'{DOMAIN}/about', 'priority': '0.6', 'changefreq': 'monthly', 'source': 'about.html'},
+    {'loc': f'{DOMAIN}/legal', 'priority': '0.5', 'changefreq': 'monthly', 'source': 'legal.html'},
+    {'loc': f'{DOMAIN}/blog/', 'priority': '0.9', 'changefreq': 'weekly', 'source': os.path.join('blog', 'index.html'), 'listing': True},
+    {'loc': f'{DOMAIN}/sitemap', 'priority': '0.4', 'changefreq': 'weekly', 'source': SITEMAP_HTML, 'listing': True},
+]
 
 h1_pattern = re.compile(r'<h1[^>]*>(.*?)</h1>', re.DOTALL)
 tag_pattern = re.compile(r'<[^>]+>')
 # 优先匹配 <time datetime="YYYY-MM-DD">
 time_tag_pattern = re.compile(r'<time[^>]*datetime="(\d{4}-\d{2}-\d{2})"')
 
-def main():
-    posts = []
-    if not os.path.exists(BLOG_DIR):
-        print("Blog dir not found")
-        return
-
-    for filename in os.listdir(BLOG_DIR):
+def read_post_documents():
+    # Sorted so every consumer sees the posts in the same, stable order
+    documents = {}
+    for filename in sorted(os.listdir(BLOG_DIR)):
         if filename.endswith('.html') and filename != 'index.html':
             filepath = os.path.join(BLOG_DIR, filename)
             with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            match = h1_pattern.search(content)
-            title = "Untitled"
-            if match:
-                clean_title = tag_pattern.sub('', match.group(1))
-                title = ' '.join(clean_title.split())
-            
-            # 优先提取 <time> 标签中的日期，如果没有则使用文件修改时间
-            date_match = time_tag_pattern.search(content)
-            if date_match:
-                date_str = date_match.group(1)
-            else:
-                # Fallback: Use file modification time
-                date_str = datetime.fromtimestamp(os.path.getmtime(filepath)).strftime('%Y-%m-%d')
-            
-            slug = filename[:-5]
-            url = f"{DOMAIN}/blog/{slug}"
-            
-            posts.append({'title': title, 'url': url, 'date': date_str})
+                documents[filepath] = f.read()
+    return documents
+
+def get_post_entry(filepath, content):
+    """The {'title', 'url', 'date'} of one post in posts.json and the sitemaps."""
+    filename = os.path.basename(filepath)
+    match = h1_pattern.search(content)
+    title = "Untitled"
+    if match:
+        clean_title = tag_pattern.sub('', match.group(1))
+        title = ' '.join(clean_title.split())
     
+    # 优先提取 <time> 标签中的日期，如果没有则使用文件修改时间
+    date_match = time_tag_pattern.search(content)
+    if date_match:
+        date_str = date_match.group(1)
+    else:
+        # Fallback: Use file modification time
+        date_str = datetime.fromtimestamp(os.path.getmtime(filepath)).strftime('%Y-%m-%d')
+    
+    slug = filename[:-5]
+    url = f"{DOMAIN}/blog/{slug}"
+    
+    return {'title': title, 'url': url, 'date': date_str}
+
+class SitemapWriter:
+    """
+    Streams <url> entries into sitemap files of at most max_urls entries and
+    max_bytes (uncompressed) each, without keeping them in memory.
+    """
+
+    def __init__(self, gzip_parts=SITEMAP_GZIP, max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+        self.gzip_parts = gzip_parts
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        # [(AtomicFile, newest lastmod)] of the finished parts
+        self.parts = []
+        self.current = None
+
+    def open_part(self):
+        self.file = AtomicFile(DIST_DIR)
+        self.current = self.file
+        if self.gzip_parts:
+            self.current = gzip.GzipFile(filename='', mode='wb', fileobj=self.file, compresslevel=9, mtime=0)
+        self.count = 0
+        self.size = 0
+        self.lastmod = ''
+        self.write(XML_DECLARATION + f'<urlset xmlns="{SITEMAP_NS}">\n')
+
+    def close_part(self):
+        self.write('</urlset>\n')
+        if self.current is not self.file:
+            self.current.close()
+        self.file.close()
+        self.parts.append((self.file, self.lastmod))
+        self.current = None
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.current.write(data)
+        self.size += len(data)
+
+    def add(self, loc, lastmod, priority, changefreq):
+        entry = (f'  <url>\n    <loc>{escape(loc)}</loc>\n    <lastmod>{lastmod}</lastmod>\n'
+                 f'    <priority>{priority}</priority>\n    <changefreq>{changefreq}</changefreq>\n  </url>\n')
+        if self.current is not None and (self.count >= self.max_urls
+                                         or self.size + len(entry.encode('utf-8')) + len('</urlset>\n') > self.max_bytes):
+            self.close_part()
+        if self.current is None:
+            self.open_part()
+        self.write(entry)
+        self.count += 1
+        self.lastmod = max(self.lastmod, lastmod)
+
+    def get_part_name(self, number):
+        return SITEMAP_PART.format(number) + ('.gz' if self.gzip_parts else '')
+
+    def finish(self):
+        """Commits the sitemap (and its parts). Returns the number of files that changed."""
+        if self.current is None and not self.parts:
+            self.open_part()
+        if self.current is not None:
+            self.close_part()
+        if len(self.parts) == 1 and not self.gzip_parts:
+            # One plain file: sitemap.xml itself, as robots.txt announces it
+            changed = self.parts[0][0].commit(dist_path(SITEMAP_XML))
+            remove_stale_parts(0)
+            return changed
+
+        changed = 0
+        lines = [XML_DECLARATION + f'<sitemapindex xmlns="{SITEMAP_NS}">\n']
+        for number, (part, lastmod) in enumerate(self.parts, 1):
+            name = self.get_part_name(number)
+            changed += part.commit(dist_path(name))
+            lines.append(f'  <sitemap>\n    <loc>{escape(DOMAIN)}/{name}</loc>\n'
+                         f'    <lastmod>{lastmod}</lastmod>\n  </sitemap>\n')
+        lines.append('</sitemapindex>\n')
+        changed += write_file_atomic(dist_path(SITEMAP_XML), ''.join(lines))
+        remove_stale_parts(len(self.parts), self.gzip_parts)
+        return changed
+
+    def discard(self):
+        if self.current is not None and self.current is not self.file:
+            self.current.close()
+        for part, _ in self.parts + ([(self.file, '')] if self.current is not None else []):
+            part.discard()
+
+def remove_stale_parts(count, gzip_parts=False):
+    """
+    Removes sitemap-N.xml(.gz) files that are not among the count current
+    parts. The .gz / .br siblings compress.py writes next to current plain
+    parts are its own (see compress.py) and are kept.
+    """
+    pattern = re.compile(r'^sitemap-(\d+)\.xml(\.gz|\.br)?$')
+    for filename in os.listdir(DIST_DIR):
+        match = pattern.match(filename)
+        if match and (int(match.group(1)) > count or (gzip_parts and not match.group(2))):
+            remove_file(dist_path(filename))
+
+def hash_content(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def read_source(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return ''
+
+def get_source_dates():
+    """
+    {path: date of the last commit touching it} for the page sources, from
+    one git log walk. Sources with uncommitted changes are left out, as is
+    everything when git is not available.
+    """
+    paths = [BLOG_DIR] + [page['source'] for page in STATIC_PAGES]
+    git = ['git', '-c', 'core.quotePath=false']
+    try:
+        log = subprocess.run(git + ['log', '--format=%x00%cs', '--name-only', '--no-renames', '--relative', '--'] + paths,
+                             capture_output=True, text=True, check=True).stdout
+        dirty = subprocess.run(git + ['diff', '--name-only', '--relative', 'HEAD', '--'] + paths,
+                               capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    dates = {}
+    for block in log.split('\0')[1:]:
+        date, *names = block.strip().split('\n')
+        for name in names:
+            dates.setdefault(os.path.normpath(name), date)
+    for name in dirty.splitlines():
+        dates.pop(os.path.normpath(name), None)
+    return dates
+
+def load_sitemap_state():
+    try:
+        with open(SITEMAP_STATE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get_lastmod(state, new_state, loc, digest, get_changed_date):
+    """lastmod of loc: kept while its content hash is unchanged, else get_changed_date()."""
+    entry = state.get(loc)
+    lastmod = entry[1] if entry and entry[0] == digest else get_changed_date()
+    new_state[loc] = [digest, lastmod]
+    return lastmod
+
+def main(documents=None):
+    """
+    documents: optional {filepath: html} store already loaded by build.py.
+    Without it (standalone run) the posts are read from BLOG_DIR.
+    """
+    posts = []
+    if documents is None:
+        if not os.path.exists(BLOG_DIR):
+            print("Blog dir not found")
+            return
+        documents = read_post_documents()
+
+    for filepath, content in documents.items():
+        posts.append(get_post_entry(filepath, content))
+
     posts.sort(key=lambda x: x['date'], reverse=True)
     
     # JSON
-    with open(POSTS_JSON, 'w', encoding='utf-8') as f:
-        json.dump(posts, f, ensure_ascii=False, indent=2)
-        
-    # XML
-    urlset = ET.Element('urlset', xmlns="http://www.sitemaps.org/schemas/sitemap/0.9")
-    static_pages = [
-        {'loc': f'{DOMAIN}/', 'priority': '1.0', 'changefreq': 'weekly'},
-        {'loc': f'{DOMAIN}/about', 'priority': '0.6', 'changefreq': 'monthly'},
-        {'loc': f'{DOMAIN}/legal', 'priority': '0.5', 'changefreq': 'monthly'},
-        {'loc': f'{DOMAIN}/blog/', 'priority': '0.9', 'changefreq': 'weekly'},
-        {'loc': f'{DOMAIN}/sitemap', 'priority': '0.4', 'changefreq': 'weekly'},
-    ]
-    for page in static_pages:
-        u = ET.SubElement(urlset, 'url')
-        ET.SubElement(u, 'loc').text = page['loc']
-        ET.SubElement(u, 'lastmod').text = datetime.now().strftime('%Y-%m-%d')
-        ET.SubElement(u, 'priority').text = page['priority']
-        ET.SubElement(u, 'changefreq').text = page['changefreq']
-        
-    for post in posts:
-        u = ET.SubElement(urlset, 'url')
-        ET.SubElement(u, 'loc').text = post['url']
-        ET.SubElement(u, 'lastmod').text = post['date']
-        ET.SubElement(u, 'priority').text = '0.8'
-        ET.SubElement(u, 'changefreq').text = 'weekly'
-        
-    xml_str = minidom.parseString(ET.tostring(urlset)).toprettyxml(indent="  ")
-    # XML
-    xml_str = minidom.parseString(ET.tostring(urlset)).toprettyxml(indent="  ")
-    with open(SITEMAP_XML, 'w', encoding='utf-8') as f:
-        f.write(xml_str)
-    print(f"✅ Updated {SITEMAP_XML}")
+    write_file_atomic(dist_path(POSTS_JSON), json.dumps(posts, ensure_ascii=False, indent=2))
 
     # Update sitemap.html
     update_sitemap_html(posts)
 
+    # XML
+    state = load_sitemap_state()
+    new_state = {}
+    today = datetime.now().strftime('%Y-%m-%d')
+    source_dates = None
+
+    def get_source_date(path):
+        # git is only asked when some content changed
+        nonlocal source_dates
+        if source_dates is None:
+            source_dates = get_source_dates()
+        return source_dates.get(os.path.normpath(path), today)
+
+    post_lastmods = {}
+    for post in posts:
+        filepath = os.path.join(BLOG_DIR, post['url'].rsplit('/', 1)[1] + '.html')
+        post_lastmods[post['url']] = get_lastmod(
+            state, new_state, post['url'], hash_content(documents.get(filepath, '')),
+            lambda: max(post['date'], get_source_date(filepath)))
+    newest_post = max(post_lastmods.values(), default='')
+    listing = json.dumps([[post['url'], post['title'], post['date']] for post in posts], ensure_ascii=False)
+
+    writer = SitemapWriter()
+    try:
+        for page in STATIC_PAGES:
+            digest = hash_content(read_source(page['source']), listing if page.get('listing') else '')
+            if page.get('listing'):
+                changed_date = lambda: max(get_source_date(page['source']), newest_post)
+            else:
+                changed_date = lambda: get_source_date(page['source'])
+            lastmod = get_lastmod(state, new_state, page['loc'], digest, changed_date)
+            writer.add(page['loc'], lastmod, page['priority'], page['changefreq'])
+        for post in posts:
+            writer.add(post['url'], post_lastmods[post['url']], '0.8', 'weekly')
+        changed = writer.finish()
+    except BaseException:
+        writer.discard()
+        raise
+    write_file_atomic(SITEMAP_STATE, json.dumps(new_state, ensure_ascii=False, indent=2, sort_keys=True))
+    # Changed-URL feed for bing_push.py / baidu_push.py
+    changed_urls = update_feed({url: entry[0] for url, entry in state.items()},
+                               {url: entry[0] for url, entry in new_state.items()})
+    parts = f", {len(writer.parts)} part(s)" if len(writer.parts) > 1 or writer.gzip_parts else ""
+    print(f"✅ {'Updated' if changed else 'Unchanged'} {dist_path(SITEMAP_XML)} "
+          f"({len(new_state)} URLs{parts}, {changed_urls} changed since the last build)")
+
 def update_sitemap_html(posts):
-    sitemap_html_path = 'sitemap.html'
+    # Source page in the repo root, generated copy in dist
+    sitemap_html_path = SITEMAP_HTML
     if not os.path.exists(sitemap_html_path):
         print(f"⚠️ {sitemap_html_path} not found, skipping HTML update.")
         return
@@ -124,9 +341,8 @@ def update_sitemap_html(posts):
     new_content, count = re.subn(pattern, replace_list, content, flags=re.DOTALL)
     
     if count > 0:
-        with open(sitemap_html_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        print(f"✅ Updated {sitemap_html_path} with {len(posts)} posts.")
+        write_file_atomic(dist_path(SITEMAP_HTML), publish_page(new_content, dist_path(SITEMAP_HTML)))
+        print(f"✅ Updated {dist_path(SITEMAP_HTML)} with {len(posts)} posts.")
     else:
         print(f"⚠️ Could not find <ul id=\"blog-posts\"> in {sitemap_html_path}")
 